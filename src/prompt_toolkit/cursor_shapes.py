@@ -62,7 +62,7 @@ class ModalCursorShapeConfig(CursorShapeConfig):
 
     def get_cursor_shape(self, application: Application[Any]) -> CursorShape:
         if application.editing_mode == EditingMode.VI:
-            if application.vi_state.input_mode == InputMode.INSERT:
+            if application.vi_state.input_mode is InputMode.INSERT:
                 return self.vi_insert
             else:
                 return self.vi_navigation
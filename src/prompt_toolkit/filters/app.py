@@ -137,9 +137,10 @@ def vi_navigation_mode() ->bool:
     """
     Active when the set for Vi navigation key bindings are active.
     """
+    from prompt_toolkit.key_binding.vi_state import InputMode
     app = get_app()
-    return app.editing_mode == EditingMode.VI and \
-           app.vi_state.input_mode == 'navigation'
+    return (app.editing_mode == EditingMode.VI and app.vi_state.input_mode is
+        InputMode.NAVIGATION)
 
 
 @Condition
@@ -3,7 +3,6 @@ from .base import Always, Filter, FilterOrBool, Never
 __all__ = ['to_filter', 'is_true']
 _always = Always()
 _never = Never()
-_bool_to_filter: dict[bool, Filter] = {(True): _always, (False): _never}
 
 
 def to_filter(bool_or_filter: FilterOrBool) ->Filter:
@@ -11,8 +10,12 @@ def to_filter(bool_or_filter: FilterOrBool) ->Filter:
     Accept both booleans and Filters as input and
     turn it into a Filter.
     """
-    if isinstance(bool_or_filter, bool):
-        return _bool_to_filter[bool_or_filter]
+    # Identity checks first: `False`/`True` are by far the most common
+    # arguments, e.g. for the ten filters of every `Window`.
+    if bool_or_filter is False:
+        return _never
+    if bool_or_filter is True:
+        return _always
     return bool_or_filter
 
 
@@ -36,10 +36,10 @@ been assigned, through the `key_binding` decorator.::
 """
 from __future__ import annotations
 from abc import ABCMeta, abstractmethod, abstractproperty
+from collections import defaultdict
 from inspect import isawaitable
 from typing import TYPE_CHECKING, Any, Callable, Coroutine, Hashable, Sequence, Tuple, TypeVar, Union, cast
-from prompt_toolkit.cache import SimpleCache
-from prompt_toolkit.filters import FilterOrBool, Never, to_filter
+from prompt_toolkit.filters import Always, FilterOrBool, Never, to_filter
 from prompt_toolkit.keys import KEY_ALIASES, Keys
 if TYPE_CHECKING:
     from .key_processor import KeyPressEvent
@@ -59,6 +59,8 @@ class Binding:
     :param record_in_macro: When True, don't record this key binding when a
         macro is recorded.
     """
+    __slots__ = ('keys', 'handler', 'filter', 'eager', 'is_global',
+        'save_before', 'record_in_macro', '_always_true')
 
     def __init__(self, keys: tuple[Keys | str, ...], handler:
         KeyHandlerCallable, filter: FilterOrBool=True, eager: FilterOrBool=
@@ -68,11 +70,31 @@ class Binding:
         self.keys = keys
         self.handler = handler
         self.filter = to_filter(filter)
+        # Most bindings are unconditional. Remember that, so that the key
+        # processor doesn't have to call the filter for every key press.
+        self._always_true = isinstance(self.filter, Always)
         self.eager = to_filter(eager)
         self.is_global = to_filter(is_global)
         self.save_before = save_before
         self.record_in_macro = to_filter(record_in_macro)
 
+    def call(self, event: KeyPressEvent) ->None:
+        result = self.handler(event)
+
+        # If the handler is a coroutine, create an asyncio task.
+        if isawaitable(result):
+            awaitable = cast(Coroutine[Any, Any, 'NotImplementedOrNone'],
+                result)
+
+            async def bg_task() ->None:
+                result = await awaitable
+                if result != NotImplemented:
+                    event.app.invalidate()
+            event.app.create_background_task(bg_task())
+
+        elif result != NotImplemented:
+            event.app.invalidate()
+
     def __repr__(self) ->str:
         return '{}(keys={!r}, handler={!r})'.format(self.__class__.__name__,
             self.keys, self.handler)
@@ -129,6 +151,16 @@ class KeyBindingsBase(metaclass=ABCMeta):
         """
         pass
 
+    @property
+    def _continuation_keys(self) ->(set[Keys | str] | None):
+        """
+        The first keys of all key sequences that consist of more than one key,
+        or `None` when this is unknown.
+        (If this contains `Keys.Any`, any key can start such a sequence.)
+        Keys that are not in here are never a prefix of a longer match.
+        """
+        return None
+
 
 T = TypeVar('T', bound=Union[KeyHandlerCallable, Binding])
 
@@ -157,12 +189,81 @@ class KeyBindings(KeyBindingsBase):
 
     def __init__(self) ->None:
         self._bindings: list[Binding] = []
-        self._get_bindings_for_keys_cache: SimpleCache[KeysTuple, list[Binding]
-            ] = SimpleCache(maxsize=10000)
-        self._get_bindings_starting_with_keys_cache: SimpleCache[KeysTuple,
-            list[Binding]] = SimpleCache(maxsize=1000)
+        # Dispatch tables. The key sequence of every binding maps onto the
+        # bindings for exactly that sequence, and every (strict) prefix of it
+        # maps onto the bindings that start with that prefix.
+        self._exact_table: dict[KeysTuple, list[Binding]] = {}
+        self._prefix_table: defaultdict[KeysTuple, list[Binding]
+            ] = defaultdict(list)
+        # Bindings with a `Keys.Any` wildcard can't be put in the tables.
+        # These are usually few, they are matched separately.
+        self._any_bindings: list[Binding] = []
+        self._first_keys_of_longer: set[Keys | str] = set()
+        self._indexed_count = 0
         self.__version = 0
 
+    @property
+    def bindings(self) ->list[Binding]:
+        return self._bindings
+
+    @property
+    def _version(self) ->Hashable:
+        self._sync_tables()
+        return self.__version
+
+    @property
+    def _continuation_keys(self) ->set[Keys | str]:
+        self._sync_tables()
+        return self._first_keys_of_longer
+
+    def _sync_tables(self) ->None:
+        """
+        Rebuild the dispatch tables when `bindings` was modified directly.
+        (Like `bindings.append(...)`, which bypasses `add`.)
+        """
+        if len(self._bindings) != self._indexed_count:
+            self._rebuild_tables()
+            self.__version += 1
+
+    def _index_binding(self, binding: Binding) ->None:
+        """
+        Add a binding to the dispatch tables.
+        """
+        keys = binding.keys
+        if len(keys) > 1:
+            self._first_keys_of_longer.add(keys[0])
+
+        if Keys.Any in keys:
+            self._any_bindings.append(binding)
+            return
+
+        self._exact_table.setdefault(keys, []).append(binding)
+        for i in range(len(keys)):
+            self._prefix_table[keys[:i]].append(binding)
+
+    def _append(self, binding: Binding) ->None:
+        """
+        Add a `Binding` object, and update the dispatch tables.
+        """
+        self._sync_tables()
+        self._bindings.append(binding)
+        self._index_binding(binding)
+        self._indexed_count += 1
+        self.__version += 1
+
+    def _rebuild_tables(self) ->None:
+        """
+        Rebuild the dispatch tables from scratch. (After bindings have been
+        removed.)
+        """
+        self._exact_table = {}
+        self._prefix_table = defaultdict(list)
+        self._any_bindings = []
+        self._first_keys_of_longer = set()
+        for b in self._bindings:
+            self._index_binding(b)
+        self._indexed_count = len(self._bindings)
+
     def add(self, *keys: (Keys | str), filter: FilterOrBool=True, eager:
         FilterOrBool=False, is_global: FilterOrBool=False, save_before:
         Callable[[KeyPressEvent], bool]=lambda e: True, record_in_macro:
@@ -185,13 +286,14 @@ class KeyBindings(KeyBindingsBase):
         :param record_in_macro: Record these key bindings when a macro is
             being recorded. (True by default.)
         """
+        keys = tuple(_parse_key(k) for k in keys)
+
         def decorator(func: T) -> T:
             if callable(func):
                 binding = Binding(keys, func, filter=filter, eager=eager,
                                   is_global=is_global, save_before=save_before,
                                   record_in_macro=record_in_macro)
-                self._bindings.append(binding)
-                self.__version += 1
+                self._append(binding)
             return func
         return decorator
 
@@ -221,7 +323,8 @@ class KeyBindings(KeyBindingsBase):
 
         for b in bindings_to_remove:
             self._bindings.remove(b)
-        
+
+        self._rebuild_tables()
         self.__version += 1
     add_binding = add
     remove_binding = remove
@@ -234,10 +337,17 @@ class KeyBindings(KeyBindingsBase):
 
         :param keys: tuple of keys.
         """
-        def get():
-            return [b for b in self._bindings if b.keys == keys]
-
-        return self._get_bindings_for_keys_cache.get(keys, get)
+        self._sync_tables()
+        result = list(self._exact_table.get(keys, ()))
+
+        if self._any_bindings:
+            any_matches = self._get_any_matches(keys, longer=False)
+            if any_matches:
+                # Place bindings that have more 'Any' occurrences in them at
+                # the start. (The last binding gets priority.)
+                any_matches.sort(key=lambda b: -b.keys.count(Keys.Any))
+                result = any_matches + result
+        return result
 
     def get_bindings_starting_with_keys(self, keys: KeysTuple) ->list[Binding]:
         """
@@ -248,23 +358,55 @@ class KeyBindings(KeyBindingsBase):
 
         :param keys: tuple of keys.
         """
-        pass
+        self._sync_tables()
+        result = list(self._prefix_table.get(keys, ()))
+
+        if self._any_bindings:
+            any_matches = self._get_any_matches(keys, longer=True)
+            if any_matches:
+                result.extend(any_matches)
+        return result
+
+    def _get_any_matches(self, keys: KeysTuple, longer: bool) ->list[Binding]:
+        """
+        Return the `Keys.Any` bindings that match `keys` position by position.
+
+        :param longer: When True, return the bindings for sequences that are
+            longer than `keys` instead of the ones of the same length.
+        """
+        n = len(keys)
+        result = []
+
+        for b in self._any_bindings:
+            if (len(b.keys) > n if longer else len(b.keys) == n):
+                for i, j in zip(b.keys, keys):
+                    if i != j and i != Keys.Any:
+                        break
+                else:
+                    result.append(b)
+        return result
+
+
+# Parsed result for every named key and alias. (`Keys` members hash and compare
+# like their string value, so this resolves both `Keys` and `str` input.)
+_PARSED_KEYS: dict[Keys | str, Keys | str] = {k.value: k for k in Keys}
+_PARSED_KEYS.update((alias, Keys(target)) for alias, target in KEY_ALIASES.
+    items())
 
 
 def _parse_key(key: (Keys | str)) ->(str | Keys):
     """
     Replace key by alias and verify whether it's a valid one.
     """
-    if isinstance(key, Keys):
-        return key
-    
-    if key in KEY_ALIASES:
-        return KEY_ALIASES[key]
-    
-    if len(key) == 1:
-        return key
-    
-    raise ValueError(f"Invalid key: {key}")
+    try:
+        return _PARSED_KEYS[key]
+    except KeyError:
+        pass
+
+    if len(key) != 1:
+        raise ValueError(f"Invalid key: {key}")
+
+    return key
 
 
 def key_binding(filter: FilterOrBool=True, eager: FilterOrBool=False,
@@ -294,9 +436,25 @@ class _Proxy(KeyBindingsBase):
     """
 
     def __init__(self) ->None:
-        self._bindings2: KeyBindingsBase = KeyBindings()
+        self._bindings2 = KeyBindings()
         self._last_version: Hashable = ()
 
+    @property
+    def _bindings2(self) ->KeyBindingsBase:
+        """
+        `KeyBindings` to be synchronized with all the others.
+        """
+        return self._synced_bindings
+
+    @_bindings2.setter
+    def _bindings2(self, value: KeyBindingsBase) ->None:
+        # Keep the bound lookup methods around, so that every proxied lookup
+        # doesn't have to resolve them again.
+        self._synced_bindings = value
+        self._get_bindings_for_keys = value.get_bindings_for_keys
+        self._get_bindings_starting_with_keys = (value.
+            get_bindings_starting_with_keys)
+
     def _update_cache(self) ->None:
         """
         If `self._last_version` is outdated, then this should update
@@ -304,6 +462,29 @@ class _Proxy(KeyBindingsBase):
         """
         pass
 
+    @property
+    def bindings(self) ->list[Binding]:
+        self._update_cache()
+        return self._bindings2.bindings
+
+    @property
+    def _version(self) ->Hashable:
+        self._update_cache()
+        return self._last_version
+
+    @property
+    def _continuation_keys(self) ->(set[Keys | str] | None):
+        self._update_cache()
+        return self._bindings2._continuation_keys
+
+    def get_bindings_for_keys(self, keys: KeysTuple) ->list[Binding]:
+        self._update_cache()
+        return self._get_bindings_for_keys(keys)
+
+    def get_bindings_starting_with_keys(self, keys: KeysTuple) ->list[Binding]:
+        self._update_cache()
+        return self._get_bindings_starting_with_keys(keys)
+
 
 class ConditionalKeyBindings(_Proxy):
     """
@@ -353,7 +534,20 @@ class _MergedKeyBindings(_Proxy):
         If one of the original registries was changed. Update our merged
         version.
         """
-        pass
+        version = tuple(r._version for r in self.registries)
+
+        if self._last_version != version:
+            # Insert all bindings into one flat `KeyBindings`, so that lookups
+            # hit a single set of dispatch tables, instead of going through
+            # every registry.
+            bindings2 = KeyBindings()
+
+            for reg in self.registries:
+                for b in reg.bindings:
+                    bindings2._append(b)
+
+            self._bindings2 = bindings2
+            self._last_version = version
 
 
 def merge_key_bindings(bindings: Sequence[KeyBindingsBase]
@@ -365,7 +559,7 @@ def merge_key_bindings(bindings: Sequence[KeyBindingsBase]
 
         bindings = merge_key_bindings([bindings1, bindings2, ...])
     """
-    pass
+    return _MergedKeyBindings(bindings)
 
 
 class DynamicKeyBindings(_Proxy):
@@ -7,15 +7,15 @@ correct callbacks when new key presses are feed through `feed`.
 """
 from __future__ import annotations
 import weakref
-from asyncio import Task, sleep
+from asyncio import sleep
 from collections import deque
-from typing import TYPE_CHECKING, Any, Generator
+from typing import TYPE_CHECKING, Any
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.enums import EditingMode
 from prompt_toolkit.filters.app import vi_navigation_mode
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.utils import Event
-from .key_bindings import Binding, KeyBindingsBase
+from .key_bindings import Binding, KeyBindingsBase, KeysTuple
 if TYPE_CHECKING:
     from prompt_toolkit.application import Application
     from prompt_toolkit.buffer import Buffer
@@ -27,6 +27,7 @@ class KeyPress:
     :param key: A `Keys` instance or text (one character).
     :param data: The received string on stdin. (Often vt100 escape codes.)
     """
+    __slots__ = 'key', 'data'
 
     def __init__(self, key: (Keys | str), data: (str | None)=None) ->None:
         assert isinstance(key, Keys) or len(key) == 1
@@ -43,9 +44,13 @@ class KeyPress:
             f'{self.__class__.__name__}(key={self.key!r}, data={self.data!r})')
 
     def __eq__(self, other: object) ->bool:
-        if not isinstance(other, KeyPress):
-            return False
-        return self.key == other.key and self.data == other.data
+        # `KeyPress` is never subclassed; an identity check on the class is
+        # cheaper than `isinstance`.
+        return (other.__class__ is KeyPress and self.key == other.key and
+            self.data == other.data)
+
+    def __hash__(self) ->int:
+        return hash((self.key, self.data))
 
 
 """
@@ -55,6 +60,84 @@ NOTE: the implementation is very similar to the VT100 parser.
 _Flush = KeyPress('?', data='_Flush')
 
 
+class _Matcher:
+    """
+    State machine implementing the key match algorithm. Key strokes are fed
+    into it one at a time, and it calls the appropriate handlers of the
+    :class:`KeyProcessor`.
+
+    (This used to be a generator, but calling a method directly avoids the
+    `send`/`yield` plumbing for every key press.)
+    """
+    __slots__ = '_processor', 'buffer', '_keys'
+
+    def __init__(self, processor: KeyProcessor) ->None:
+        self._processor = processor
+        self.buffer: list[KeyPress] = []
+
+        # The keys of the presses in `buffer`. Maintained alongside `buffer`,
+        # so that no tuple has to be built for every lookup.
+        self._keys: KeysTuple = ()
+
+    def feed(self, key_press: KeyPress, app: Application[Any] | None=None
+        ) ->None:
+        processor = self._processor
+        buffer = self.buffer
+        flush = key_press is _Flush
+
+        if not flush:
+            buffer.append(key_press)
+            self._keys += (key_press.key,)
+
+        # Keep going until all keys in the buffer are handled, or until we
+        # have to wait for more keys.
+        while buffer:
+            keys = self._keys
+            matches = processor._get_matches(keys)
+
+            if flush:
+                is_prefix_of_longer_match = False
+            else:
+                is_prefix_of_longer_match = (processor.
+                    _is_prefix_of_longer_match(keys))
+
+            # When eager matches were found, give priority to them and also
+            # ignore all the longer matches.
+            eager_matches = [m for m in matches if m.eager()]
+
+            if eager_matches:
+                matches = eager_matches
+                is_prefix_of_longer_match = False
+
+            if is_prefix_of_longer_match:
+                return
+
+            # Exact matches found, call handler.
+            if matches:
+                processor._call_handler(matches[-1], key_sequence=buffer[:],
+                    app=app)
+                buffer.clear()  # In place: `key_buffer` refers to this list.
+                self._keys = ()
+                return
+
+            # No match found. Loop over the input, try longest match first and
+            # shift.
+            for i in range(len(buffer), 0, -1):
+                matches = processor._get_matches(keys[:i])
+                if matches:
+                    processor._call_handler(matches[-1], key_sequence=buffer[
+                        :i], app=app)
+                    del buffer[:i]
+                    self._keys = keys[i:]
+                    break
+            else:
+                del buffer[0]
+                self._keys = keys[1:]
+
+            # Retry the remaining keys, this time without flushing.
+            flush = False
+
+
 class KeyProcessor:
     """
     Statemachine that receives :class:`KeyPress` instances and according to the
@@ -79,59 +162,57 @@ class KeyProcessor:
 
     def __init__(self, key_bindings: KeyBindingsBase) ->None:
         self._bindings = key_bindings
+        # Weak reference to ourself, given to every `KeyPressEvent`. (Created
+        # once, instead of for every event.)
+        self._weak_self = weakref.ref(self)
         self.before_key_press = Event(self)
         self.after_key_press = Event(self)
-        self._flush_wait_task: Task[None] | None = None
+        # Incremented every time a new timeout is started. A pending auto
+        # flush only runs if no newer timeout was started in the meantime.
+        self._flush_generation = 0
         self.reset()
 
-    def _get_matches(self, key_presses: list[KeyPress]) ->list[Binding]:
-        """
-        For a list of :class:`KeyPress` instances. Give the matching handlers
-        that would handle this.
-        """
-        return [b for b in self._bindings.get_bindings_for_keys(key_presses) if b.filter()]
+    def reset(self) ->None:
+        self._previous_key_sequence: list[KeyPress] = []
+        self._previous_handler: Binding | None = None
+
+        # The queue of keys not yet send to our _process generator/state machine.
+        self.input_queue: deque[KeyPress] = deque()
+
+        #: Readline argument (for repetition of commands.)
+        self.arg: str | None = None
 
-    def _is_prefix_of_longer_match(self, key_presses: list[KeyPress]) ->bool:
+        # The state machine that matches keys against the key bindings.
+        self._matcher = _Matcher(self)
+
+        # The key buffer that is matched in the state machine. (This is at
+        # most the amount of keys that make up for one key binding.)
+        self.key_buffer: list[KeyPress] = self._matcher.buffer
+
+    def _get_matches(self, keys: KeysTuple) ->list[Binding]:
         """
-        For a list of :class:`KeyPress` instances. Return True if there is any
-        handler that is bound to a suffix of this keys.
+        For a tuple of keys (of :class:`KeyPress` instances). Give the matching
+        handlers that would handle this.
         """
-        for b in self._bindings.get_bindings_starting_with_keys(key_presses):
-            if b.filter():
-                return True
-        return False
+        return [b for b in self._bindings.get_bindings_for_keys(keys) if b.
+            _always_true or b.filter()]
 
-    def _process(self) ->Generator[None, KeyPress, None]:
+    def _is_prefix_of_longer_match(self, keys: KeysTuple) ->bool:
         """
-        Coroutine implementing the key match algorithm. Key strokes are sent
-        into this generator, and it calls the appropriate handlers.
+        For a tuple of keys (of :class:`KeyPress` instances). Return True if
+        there is any handler that is bound to a suffix of this keys.
         """
-        buffer: list[KeyPress] = []
-        retry = False
-
-        while True:
-            if retry:
-                retry = False
-            else:
-                key_press = yield
-
-            if key_press is _Flush:
-                self._flush(buffer)
-                buffer = []
-                continue
-
-            buffer.append(key_press)
+        # Most keys (like all printable characters) never start a longer key
+        # sequence. Don't do a lookup for these.
+        continuation_keys = self._bindings._continuation_keys
+        if (continuation_keys is not None and keys[0] not in
+            continuation_keys and Keys.Any not in continuation_keys):
+            return False
 
-            matches = self._get_matches(buffer)
-            if matches:
-                self._call_handler(matches[-1], key_sequence=buffer)
-                buffer = []
-            elif self._is_prefix_of_longer_match(buffer):
-                retry = True
-            else:
-                retry = True
-                self._flush(buffer)
-                buffer = []
+        for b in self._bindings.get_bindings_starting_with_keys(keys):
+            if b._always_true or b.filter():
+                return True
+        return False
 
     def feed(self, key_press: KeyPress, first: bool=False) ->None:
         """
@@ -151,6 +232,9 @@ class KeyProcessor:
         :param first: If true, insert before everything else.
         """
         if first:
+            # `extendleft` runs in C; `reversed()` over a list is a lazy
+            # iterator, so this doesn't copy `key_presses`. (Keep the queue a
+            # `deque`: `process_keys` pops from the left for every key.)
             self.input_queue.extendleft(reversed(key_presses))
         else:
             self.input_queue.extend(key_presses)
@@ -164,9 +248,15 @@ class KeyProcessor:
               possible to call `feed` from inside a key binding.
               This function keeps looping until the queue is empty.
         """
-        while self.input_queue:
-            key_press = self.input_queue.popleft()
-            self._process().send(key_press)
+        # Bind locally; this loop runs once for every key of a paste burst.
+        # (Handlers can call `feed`, so keep popping until the queue is empty.)
+        # Look up the application only once for the whole burst.
+        app = get_app()
+        q = self.input_queue
+        feed = self._matcher.feed
+
+        while q:
+            feed(q.popleft(), app)
 
     def empty_queue(self) ->list[KeyPress]:
         """
@@ -176,6 +266,56 @@ class KeyProcessor:
         self.input_queue.clear()
         return key_presses
 
+    def _call_handler(self, handler: Binding, key_sequence: list[KeyPress],
+        app: (Application[Any] | None)=None) ->None:
+        if app is None:
+            app = get_app()
+
+        was_recording_emacs = app.emacs_state.is_recording
+        was_recording_vi = bool(app.vi_state.recording_register)
+        was_temporary_navigation_mode = app.vi_state.temporary_navigation_mode
+        arg = self.arg
+        self.arg = None
+
+        event = KeyPressEvent(self._weak_self, arg=arg, key_sequence=
+            key_sequence, previous_key_sequence=self._previous_key_sequence,
+            is_repeat=handler == self._previous_handler, app=app)
+
+        # Save the state of the current buffer.
+        if handler.save_before(event):
+            app.current_buffer.save_to_undo_stack()
+
+        # Call handler.
+        from prompt_toolkit.buffer import EditReadOnlyBuffer
+
+        try:
+            handler.call(event)
+            self._fix_vi_cursor_position(event)
+
+        except EditReadOnlyBuffer:
+            # When a key binding does an attempt to change a buffer which is
+            # read-only, we can ignore that. We sound a bell and go on.
+            app.output.bell()
+
+        if was_temporary_navigation_mode:
+            self._leave_vi_temp_navigation_mode(event)
+
+        self._previous_key_sequence = key_sequence
+        self._previous_handler = handler
+
+        # Record the key sequence in our macro. (Only if we're in macro mode
+        # before and after executing the key.)
+        if handler.record_in_macro():
+            if app.emacs_state.is_recording and was_recording_emacs:
+                recording = app.emacs_state.current_recording
+                if recording is not None:
+                    recording.extend(key_sequence)
+
+            vi_state = app.vi_state
+            if vi_state.recording_register and was_recording_vi:
+                for k in key_sequence:
+                    vi_state.append_to_recording(k.data)
+
     def _fix_vi_cursor_position(self, event: KeyPressEvent) ->None:
         """
         After every command, make sure that if we are in Vi navigation mode, we
@@ -208,14 +348,19 @@ class KeyProcessor:
         and no key was pressed in the meantime, we flush all data in the queue
         and call the appropriate key binding handlers.
         """
+        if self._timeout is None:
+            return
+
+        self._flush_generation += 1
+        generation = self._flush_generation
+
         async def auto_flush() ->None:
             await sleep(self._timeout)
-            if self._flush_wait_task and not self._flush_wait_task.done():
+            if generation == self._flush_generation:
                 self.feed(_Flush)
                 self.process_keys()
 
-        if self._timeout is not None:
-            self._flush_wait_task = get_app().create_background_task(auto_flush())
+        get_app().create_background_task(auto_flush())
 
     def send_sigint(self) ->None:
         """
@@ -235,22 +380,37 @@ class KeyPressEvent:
     :param key_sequence: List of `KeyPress` instances.
     :param previouskey_sequence: Previous list of `KeyPress` instances.
     :param is_repeat: True when the previous event was delivered to the same handler.
+    :param app: The current `Application`. (Looked up when not given.)
     """
+    __slots__ = ('_key_processor_ref', 'key_sequence',
+        'previous_key_sequence', 'is_repeat', '_arg', '_app')
 
     def __init__(self, key_processor_ref: weakref.ReferenceType[
         KeyProcessor], arg: (str | None), key_sequence: list[KeyPress],
-        previous_key_sequence: list[KeyPress], is_repeat: bool) ->None:
+        previous_key_sequence: list[KeyPress], is_repeat: bool, app: (
+        Application[Any] | None)=None) ->None:
         self._key_processor_ref = key_processor_ref
         self.key_sequence = key_sequence
         self.previous_key_sequence = previous_key_sequence
         self.is_repeat = is_repeat
         self._arg = arg
-        self._app = get_app()
+        self._app = get_app() if app is None else app
 
     def __repr__(self) ->str:
         return ('KeyPressEvent(arg={!r}, key_sequence={!r}, is_repeat={!r})'
             .format(self.arg, self.key_sequence, self.is_repeat))
 
+    @property
+    def key_processor(self) ->KeyProcessor:
+        """
+        The `KeyProcessor` that delivered this event. (Only dereferenced on
+        access; none of the other properties need it.)
+        """
+        processor = self._key_processor_ref()
+        if processor is None:
+            raise Exception('KeyProcessor was lost. This should not happen.')
+        return processor
+
     @property
     def app(self) ->Application[Any]:
         """
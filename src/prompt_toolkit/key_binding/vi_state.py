@@ -1,14 +1,22 @@
 from __future__ import annotations
+import string
 from enum import Enum
-from typing import TYPE_CHECKING, Callable
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Iterator, MutableMapping, NamedTuple
 from prompt_toolkit.clipboard import ClipboardData
 if TYPE_CHECKING:
     from .key_bindings.vi import TextObject
     from .key_processor import KeyPressEvent
-__all__ = ['InputMode', 'CharacterFind', 'ViState']
+__all__ = ['InputMode', 'CharacterFind', 'character_find', 'ViState']
 
 
 class InputMode(str, Enum):
+    """
+    Vi input mode.
+
+    Members are singletons, compare them with `is`. (This is checked for every
+    key press; an identity check is cheaper than a string comparison.)
+    """
     value: str
     INSERT = 'vi-insert'
     INSERT_MULTIPLE = 'vi-insert-multiple'
@@ -17,54 +25,188 @@ class InputMode(str, Enum):
     REPLACE_SINGLE = 'vi-replace-single'
 
 
-class CharacterFind:
+class CharacterFind(NamedTuple):
+    """
+    The target of the last `f`/`F`/`t`/`T` motion. (Immutable; equality and
+    hashing are those of the tuple.)
+    """
+    character: str
+    backwards: bool = False
 
-    def __init__(self, character: str, backwards: bool=False) ->None:
-        self.character = character
-        self.backwards = backwards
+
+@lru_cache(maxsize=512)
+def character_find(character: str, backwards: bool=False) ->CharacterFind:
+    """
+    Return a shared :class:`CharacterFind` instance for this character and
+    direction. (These are never mutated, so there is no need to allocate a
+    new one for every `f`/`F`/`t`/`T` key press.)
+    """
+    return CharacterFind(character, backwards)
+
+
+#: Names of the Vi named registers, and the position of every register in
+#: `ViState`'s register list.
+_REGISTER_NAMES = string.ascii_lowercase + string.digits
+_REGISTER_INDEX: dict[str, int] = {name: i for i, name in enumerate(
+    _REGISTER_NAMES)}
+_EMPTY_REGISTERS: tuple[None, ...] = (None,) * len(_REGISTER_NAMES)
+
+# Bits in `ViState._flags`.
+_WAITING_FOR_DIGRAPH = 1
+_TILDE_OPERATOR = 2
+_TEMPORARY_NAVIGATION_MODE = 4
+
+
+class _NamedRegisters(MutableMapping[str, ClipboardData]):
+    """
+    Dict-like view on the register list of a `ViState`.
+    """
+    __slots__ = '_vi_state',
+
+    def __init__(self, vi_state: ViState) ->None:
+        self._vi_state = vi_state
+
+    def __getitem__(self, name: str) ->ClipboardData:
+        data = self._vi_state.get_register(name)
+        if data is None:
+            raise KeyError(name)
+        return data
+
+    def __setitem__(self, name: str, data: ClipboardData) ->None:
+        self._vi_state.set_register(name, data)
+
+    def __delitem__(self, name: str) ->None:
+        self[name]
+        self._vi_state._registers[_REGISTER_INDEX[name]] = None
+
+    def __iter__(self) ->Iterator[str]:
+        for name, data in zip(_REGISTER_NAMES, self._vi_state._registers):
+            if data is not None:
+                yield name
+
+    def __len__(self) ->int:
+        return len(self._vi_state._registers) - self._vi_state._registers.count(
+            None)
 
 
 class ViState:
     """
     Mutable class to hold the state of the Vi navigation.
+
+    One instance is created for every `Application`, and it is reused for
+    every run of that application through :meth:`reset`.
     """
+    __slots__ = ('last_character_find', 'operator_func', 'operator_arg',
+        '_registers', 'input_mode', '_flags', 'digraph_symbol1',
+        'recording_register', '_recording')
 
     def __init__(self) ->None:
         self.last_character_find: CharacterFind | None = None
         self.operator_func: None | Callable[[KeyPressEvent, TextObject], None
             ] = None
         self.operator_arg: int | None = None
-        self.named_registers: dict[str, ClipboardData] = {}
-        self.__input_mode = InputMode.INSERT
-        self.waiting_for_digraph = False
+        #: Named registers, indexed by `_REGISTER_INDEX`.
+        self._registers: list[ClipboardData | None] = list(_EMPTY_REGISTERS)
+        #: The Vi mode we're currently in to. (A plain attribute: this is read
+        #: by the filters for every key press.)
+        self.input_mode = InputMode.INSERT
+        # The boolean modes below (waiting for digraph, tilde operator,
+        # temporary navigation mode), packed together. This allows testing
+        # for any of them with a single bitwise and.
+        self._flags = 0
         self.digraph_symbol1: str | None = None
-        self.tilde_operator = False
         self.recording_register: str | None = None
-        self.current_recording: str = ''
-        self.temporary_navigation_mode = False
+        # Chunks of the macro being recorded. (Joined only when the recording
+        # is read, appending to a string would be quadratic.)
+        self._recording: list[str] = []
+
+    def _get_flag(self, flag: int) ->bool:
+        return bool(self._flags & flag)
+
+    def _set_flag(self, flag: int, value: bool) ->None:
+        if value:
+            self._flags |= flag
+        else:
+            self._flags &= ~flag
+
+    @property
+    def waiting_for_digraph(self) ->bool:
+        """Waiting for digraph."""
+        return self._get_flag(_WAITING_FOR_DIGRAPH)
+
+    @waiting_for_digraph.setter
+    def waiting_for_digraph(self, value: bool) ->None:
+        self._set_flag(_WAITING_FOR_DIGRAPH, value)
 
     @property
-    def input_mode(self) ->InputMode:
-        """Get `InputMode`."""
-        return self.__input_mode
+    def tilde_operator(self) ->bool:
+        """When true, make ~ act as an operator."""
+        return self._get_flag(_TILDE_OPERATOR)
+
+    @tilde_operator.setter
+    def tilde_operator(self, value: bool) ->None:
+        self._set_flag(_TILDE_OPERATOR, value)
+
+    @property
+    def temporary_navigation_mode(self) ->bool:
+        """
+        Temporary navigation (normal) mode. This happens when control-o has
+        been pressed in insert or replace mode.
+        """
+        return self._get_flag(_TEMPORARY_NAVIGATION_MODE)
 
-    @input_mode.setter
-    def input_mode(self, value: InputMode) ->None:
-        """Set `InputMode`."""
-        self.__input_mode = value
+    @temporary_navigation_mode.setter
+    def temporary_navigation_mode(self, value: bool) ->None:
+        self._set_flag(_TEMPORARY_NAVIGATION_MODE, value)
+
+    @property
+    def named_registers(self) ->MutableMapping[str, ClipboardData]:
+        """
+        Named registers. Maps register name (e.g. 'a') to
+        :class:`ClipboardData` instances.
+        """
+        return _NamedRegisters(self)
+
+    def get_register(self, name: str) ->(ClipboardData | None):
+        """
+        Return the content of the named register, or `None` when it's empty.
+        """
+        return self._registers[_REGISTER_INDEX[name]]
+
+    def set_register(self, name: str, data: ClipboardData) ->None:
+        """
+        Store `data` in the named register.
+        """
+        self._registers[_REGISTER_INDEX[name]] = data
+
+    @property
+    def current_recording(self) ->str:
+        """
+        The keys that were recorded so far. (The recording is only stored in
+        `recording_register` after the recording is stopped.)
+        """
+        return ''.join(self._recording)
+
+    @current_recording.setter
+    def current_recording(self, value: str) ->None:
+        self._recording = [value]
+
+    def append_to_recording(self, data: str) ->None:
+        """
+        Add the data of a key press to the current recording.
+        """
+        self._recording.append(data)
 
     def reset(self) ->None:
         """
         Reset state, go back to the given mode. INSERT by default.
         """
-        self.__input_mode = InputMode.INSERT
+        self.input_mode = InputMode.INSERT
         self.last_character_find = None
         self.operator_func = None
         self.operator_arg = None
-        self.named_registers = {}
-        self.waiting_for_digraph = False
+        self._registers[:] = _EMPTY_REGISTERS  # Reuse the list.
+        self._flags = 0
         self.digraph_symbol1 = None
-        self.tilde_operator = False
         self.recording_register = None
-        self.current_recording = ''
-        self.temporary_navigation_mode = False
+        self._recording.clear()
@@ -6,7 +6,7 @@ from __future__ import annotations
 from abc import ABCMeta, abstractmethod
 from enum import Enum
 from functools import partial
-from typing import TYPE_CHECKING, Callable, Sequence, Union, cast
+from typing import TYPE_CHECKING, Callable, Hashable, Sequence, Union, cast
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.cache import SimpleCache
 from prompt_toolkit.data_structures import Point
@@ -37,6 +37,8 @@ class Container(metaclass=ABCMeta):
     Base class for user interface layout.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def reset(self) ->None:
         """
@@ -124,6 +126,33 @@ def _window_too_small() ->Window:
     )
 
 
+_remaining_space_window: Window | None = None
+
+
+def _get_remaining_space_window() ->Window:
+    """
+    Return the empty `Window` that fills the space left by the children of
+    an `HSplit` or `VSplit`. One instance is shared by all splits: it doesn't
+    keep any state that's used after it's drawn.
+    """
+    global _remaining_space_window
+    if _remaining_space_window is None:
+        _remaining_space_window = Window()
+    return _remaining_space_window
+
+
+def _make_padding_window_h(padding: AnyDimension, padding_char: (str | None
+    ), padding_style: str) ->Window:
+    """Create the padding `Window` between the children of an `HSplit`."""
+    return Window(height=padding, char=padding_char, style=padding_style)
+
+
+def _make_padding_window_v(padding: AnyDimension, padding_char: (str | None
+    ), padding_style: str) ->Window:
+    """Create the padding `Window` between the children of a `VSplit`."""
+    return Window(width=padding, char=padding_char, style=padding_style)
+
+
 class VerticalAlign(Enum):
     """Alignment for `HSplit`."""
     TOP = 'TOP'
@@ -151,8 +180,11 @@ class _Split(Container):
         AnyDimension=None, height: AnyDimension=None, z_index: (int | None)
         =None, modal: bool=False, key_bindings: (KeyBindingsBase | None)=
         None, style: (str | Callable[[], str])='') ->None:
-        self.children = [to_container(c) for c in children]
-        self.window_too_small = window_too_small or _window_too_small()
+        # Most children are containers already, skip the `to_container` call
+        # for those.
+        self.children = [(c if isinstance(c, Container) else to_container(c)
+            ) for c in children]
+        self._too_small_container = window_too_small
         self.padding = padding
         self.padding_char = padding_char
         self.padding_style = padding_style
@@ -162,6 +194,45 @@ class _Split(Container):
         self.modal = modal
         self.key_bindings = key_bindings
         self.style = style
+        self._padding_window: Window | None = None
+        self._padding_window_params: tuple[AnyDimension, str | None, str
+            ] | None = None
+        self._padding_dimension: Dimension | None = None
+
+    @property
+    def window_too_small(self) ->Container:
+        """
+        Container that is displayed when there is not enough space. (The
+        default one is only created when it's needed.)
+        """
+        if self._too_small_container is None:
+            self._too_small_container = _window_too_small()
+        return self._too_small_container
+
+    @window_too_small.setter
+    def window_too_small(self, value: (Container | None)) ->None:
+        self._too_small_container = value
+
+    _make_padding_window: Callable[[AnyDimension, str | None, str], Window]
+
+    def _get_padding_window(self) ->Window:
+        """
+        Return the `Window` that is displayed between every two children.
+        (The same instance is used for every gap. It doesn't keep any state
+        that depends on its position.)
+        """
+        padding, padding_char, padding_style = (self.padding, self.
+            padding_char, self.padding_style)
+        params = padding, padding_char, padding_style
+        if self._padding_window is None or self._padding_window_params != params:
+            self._padding_window = self._make_padding_window(padding,
+                padding_char, padding_style)
+            self._padding_window_params = params
+            # An integer padding always gives the padding window the same
+            # exact size, so its preferred size doesn't have to be asked.
+            self._padding_dimension = Dimension.exact(padding) if isinstance(
+                padding, int) else None
+        return self._padding_window
 
 
 class HSplit(_Split):
@@ -211,25 +282,37 @@ class HSplit(_Split):
             z_index=z_index, modal=modal, key_bindings=key_bindings, style=
             style)
         self.align = align
-        self._children_cache: SimpleCache[tuple[Container, ...], list[
-            Container]] = SimpleCache(maxsize=1)
-        self._remaining_space_window = Window()
+        self._children_cache: SimpleCache[Hashable, list[Container]
+            ] = SimpleCache(maxsize=1)
+        self._remaining_space_window = _get_remaining_space_window()
 
     @property
     def _all_children(self) ->list[Container]:
         """
         List of child objects, including padding.
         """
-        def create_padding():
-            return Window(width=self.padding, char=self.padding_char, style=self.padding_style)
+        # Keyed on the ids of the children. (The cached list keeps the
+        # children alive, so their ids can't be reused while it's cached.)
+        key = (*map(id, self.children), self.padding, self.padding_char,
+            self.padding_style)
+        return self._children_cache.get(key, self._build_all_children)
 
-        children = []
-        for i, c in enumerate(self.children):
-            if i != 0:
-                children.append(create_padding())
-            children.append(c)
+    _make_padding_window = staticmethod(_make_padding_window_h)
 
-        return children
+    def _build_all_children(self) ->list[Container]:
+        # Children at the even positions, one shared padding window in
+        # between.
+        n = len(self.children)
+        if n == 0:
+            return []
+
+        result: list[Container] = [None] * (2 * n - 1)  # type: ignore
+        result[0::2] = self.children
+        pad = self._get_padding_window()
+        for i in range(1, 2 * n - 1, 2):
+            result[i] = pad
+
+        return result
 
     def write_to_screen(self, screen: Screen, mouse_handlers: MouseHandlers,
         write_position: WritePosition, parent_style: str, erase_bg: bool,
@@ -254,12 +337,22 @@ class HSplit(_Split):
             height = write_position.height
 
         children = self._all_children
-        dimensions = [c.preferred_height(write_position.width, height) for c in children]
+        width = write_position.width
+        pad = self._get_padding_window()
+        pad_dimension = self._padding_dimension
+
+        if pad_dimension is None:
+            dimensions_gen = (c.preferred_height(width, height) for c in
+                children)
+        else:
+            dimensions_gen = (pad_dimension if c is pad else c.
+                preferred_height(width, height) for c in children)
 
-        if self.align == VerticalAlign.JUSTIFY:
-            return distribute_weights(dimensions, height)
+        if self.align is VerticalAlign.JUSTIFY:
+            return distribute_weights(list(dimensions_gen), height)
         else:
-            return sum_layout_dimensions(dimensions)
+            # Only summed, no need to build a list.
+            return sum_layout_dimensions(dimensions_gen)
 
 
 class VSplit(_Split):
@@ -308,25 +401,37 @@ class VSplit(_Split):
             z_index=z_index, modal=modal, key_bindings=key_bindings, style=
             style)
         self.align = align
-        self._children_cache: SimpleCache[tuple[Container, ...], list[
-            Container]] = SimpleCache(maxsize=1)
-        self._remaining_space_window = Window()
+        self._children_cache: SimpleCache[Hashable, list[Container]
+            ] = SimpleCache(maxsize=1)
+        self._remaining_space_window = _get_remaining_space_window()
 
     @property
     def _all_children(self) ->list[Container]:
         """
         List of child objects, including padding.
         """
-        def create_padding():
-            return Window(height=self.padding, char=self.padding_char, style=self.padding_style)
+        # Keyed on the ids of the children. (The cached list keeps the
+        # children alive, so their ids can't be reused while it's cached.)
+        key = (*map(id, self.children), self.padding, self.padding_char,
+            self.padding_style)
+        return self._children_cache.get(key, self._build_all_children)
+
+    _make_padding_window = staticmethod(_make_padding_window_v)
 
-        children = []
-        for i, c in enumerate(self.children):
-            if i != 0:
-                children.append(create_padding())
-            children.append(c)
+    def _build_all_children(self) ->list[Container]:
+        # Children at the even positions, one shared padding window in
+        # between.
+        n = len(self.children)
+        if n == 0:
+            return []
 
-        return children
+        result: list[Container] = [None] * (2 * n - 1)  # type: ignore
+        result[0::2] = self.children
+        pad = self._get_padding_window()
+        for i in range(1, 2 * n - 1, 2):
+            result[i] = pad
+
+        return result
 
     def _divide_widths(self, width: int) ->(list[int] | None):
         """
@@ -334,12 +439,20 @@ class VSplit(_Split):
         Or None when there is not enough space.
         """
         children = self._all_children
-        dimensions = [c.preferred_width(width) for c in children]
+        pad = self._get_padding_window()
+        pad_dimension = self._padding_dimension
+
+        if pad_dimension is None:
+            dimensions_gen = (c.preferred_width(width) for c in children)
+        else:
+            dimensions_gen = (pad_dimension if c is pad else c.
+                preferred_width(width) for c in children)
 
-        if self.align == HorizontalAlign.JUSTIFY:
-            return distribute_weights(dimensions, width)
+        if self.align is HorizontalAlign.JUSTIFY:
+            return distribute_weights(list(dimensions_gen), width)
         else:
-            return sum_layout_dimensions(dimensions)
+            # Only summed, no need to build a list.
+            return sum_layout_dimensions(dimensions_gen)
 
     def write_to_screen(self, screen: Screen, mouse_handlers: MouseHandlers,
         write_position: WritePosition, parent_style: str, erase_bg: bool,
@@ -432,6 +545,11 @@ class Float:
         drawn transparently.
     """
 
+    __slots__ = ('content', 'top', 'right', 'bottom', 'left', 'width',
+        'height', 'xcursor', 'ycursor', 'attach_to_window',
+        'hide_when_covering_content', 'allow_cover_cursor', 'z_index',
+        'transparent')
+
     def __init__(self, content: AnyContainer, top: (int | None)=None, right:
         (int | None)=None, bottom: (int | None)=None, left: (int | None)=
         None, width: (int | Callable[[], int] | None)=None, height: (int |
@@ -439,7 +557,8 @@ class Float:
         False, attach_to_window: (AnyContainer | None)=None,
         hide_when_covering_content: bool=False, allow_cover_cursor: bool=
         False, z_index: int=1, transparent: bool=False) ->None:
-        assert z_index >= 1
+        if z_index < 1:
+            raise ValueError('z_index must be >= 1, got %r' % (z_index,))
         self.left = left
         self.right = right
         self.top = top
@@ -448,9 +567,13 @@ class Float:
         self.height = height
         self.xcursor = xcursor
         self.ycursor = ycursor
-        self.attach_to_window = to_window(attach_to_window
-            ) if attach_to_window else None
-        self.content = to_container(content)
+        # Skip the conversions when we already got a `Window`/`Container`.
+        if attach_to_window is None or isinstance(attach_to_window, Window):
+            self.attach_to_window = attach_to_window
+        else:
+            self.attach_to_window = to_window(attach_to_window)
+        self.content = content if isinstance(content, Container
+            ) else to_container(content)
         self.hide_when_covering_content = hide_when_covering_content
         self.allow_cover_cursor = allow_cover_cursor
         self.z_index = z_index
@@ -487,6 +610,11 @@ class WindowRenderInfo:
         the rendered screen.
     """
 
+    __slots__ = ('window', 'ui_content', 'vertical_scroll', 'window_width',
+        'window_height', 'configured_scroll_offsets',
+        'visible_line_to_row_col', 'wrap_lines', '_rowcol_to_yx',
+        '_x_offset', '_y_offset')
+
     def __init__(self, window: Window, ui_content: UIContent,
         horizontal_scroll: int, vertical_scroll: int, window_width: int,
         window_height: int, configured_scroll_offsets: ScrollOffsets,
@@ -611,6 +739,8 @@ class ScrollOffsets:
     Note that left/right offsets only make sense if line wrapping is disabled.
     """
 
+    __slots__ = ('_top', '_bottom', '_left', '_right')
+
     def __init__(self, top: (int | Callable[[], int])=0, bottom: (int |
         Callable[[], int])=0, left: (int | Callable[[], int])=0, right: (
         int | Callable[[], int])=0) ->None:
@@ -629,6 +759,8 @@ class ColorColumn:
     Column for a :class:`.Window` to be colored.
     """
 
+    __slots__ = ('position', 'style')
+
     def __init__(self, position: int, style: str='class:color-column') ->None:
         self.position = position
         self.style = style
@@ -712,6 +844,17 @@ class Window(Container):
         so on.
     """
 
+    __slots__ = ('allow_scroll_beyond_bottom', 'always_hide_cursor',
+        'wrap_lines', 'cursorline', 'cursorcolumn', 'content',
+        'dont_extend_width', 'dont_extend_height', 'ignore_content_width',
+        'ignore_content_height', 'left_margins', 'right_margins',
+        'scroll_offsets', 'get_vertical_scroll', 'get_horizontal_scroll',
+        'colorcolumns', 'align', 'style', 'char', 'get_line_prefix', 'width',
+        'height', 'z_index', '_ui_content_cache', '_ui_content_render_counter',
+        '_margin_width_cache', '_margin_width_render_counter',
+        'vertical_scroll', 'horizontal_scroll', 'vertical_scroll_2',
+        'render_info', '__weakref__')
+
     def __init__(self, content: (UIControl | None)=None, width:
         AnyDimension=None, height: AnyDimension=None, z_index: (int | None)
         =None, dont_extend_width: FilterOrBool=False, dont_extend_height:
@@ -752,10 +895,15 @@ class Window(Container):
         self.width = width
         self.height = height
         self.z_index = z_index
-        self._ui_content_cache: SimpleCache[tuple[int, int, int], UIContent
-            ] = SimpleCache(maxsize=8)
-        self._margin_width_cache: SimpleCache[tuple[Margin, int], int
-            ] = SimpleCache(maxsize=1)
+        # `UIContent` by (width, height), for the render in
+        # `_ui_content_render_counter` only. (Content can change between
+        # renders, and is created again for the next one.)
+        self._ui_content_cache: dict[tuple[int, int], UIContent] = {}
+        self._ui_content_render_counter = -1
+        # Width by margin, for the render in `_margin_width_render_counter`.
+        # (Every margin of the window has its own entry.)
+        self._margin_width_cache: dict[Margin, int] = {}
+        self._margin_width_render_counter = -1
         self.reset()
 
     def __repr__(self) ->str:
@@ -766,13 +914,27 @@ class Window(Container):
         Return the width for this margin.
         (Calculate only once per render time.)
         """
-        pass
+        render_counter = get_app().render_counter
+        cache = self._margin_width_cache
+        if self._margin_width_render_counter != render_counter:
+            cache.clear()
+            self._margin_width_render_counter = render_counter
+
+        try:
+            return cache[margin]
+        except KeyError:
+            # Margin.get_width, needs to have a UIContent instance.
+            def get_ui_content() ->UIContent:
+                return self._get_ui_content(width=0, height=0)
+            width = cache[margin] = margin.get_width(get_ui_content)
+            return width
 
     def _get_total_margin_width(self) ->int:
         """
         Calculate and return the width of the margin (left + right).
         """
-        pass
+        return sum(self._get_margin_width(m) for m in self.left_margins
+            ) + sum(self._get_margin_width(m) for m in self.right_margins)
 
     def preferred_width(self, max_available_width: int) ->Dimension:
         """
@@ -801,7 +963,19 @@ class Window(Container):
         """
         Create a `UIContent` instance.
         """
-        pass
+        render_counter = get_app().render_counter
+        cache = self._ui_content_cache
+        if self._ui_content_render_counter != render_counter:
+            cache.clear()
+            self._ui_content_render_counter = render_counter
+
+        key = width, height
+        try:
+            return cache[key]
+        except KeyError:
+            content = cache[key] = self.content.create_content(width=width,
+                height=height)
+            return content
 
     def _get_digraph_char(self) ->(str | None):
         """Return `False`, or the Digraph symbol to be used."""
@@ -927,14 +1101,56 @@ class ConditionalContainer(Container):
     :param filter: :class:`.Filter` instance.
     """
 
+    __slots__ = ('content', 'filter', '_filter_render_counter',
+        '_filter_value', '__weakref__')
+
     def __init__(self, content: AnyContainer, filter: FilterOrBool) ->None:
         self.content = to_container(content)
         self.filter = to_filter(filter)
+        self._filter_render_counter = -1
+        self._filter_value = False
 
     def __repr__(self) ->str:
         return (
             f'ConditionalContainer({self.content!r}, filter={self.filter!r})')
 
+    def _is_visible(self) ->bool:
+        """
+        Evaluate the filter, only once per render. (For use during rendering
+        only. In between renders, the cached value can be outdated.)
+        """
+        render_counter = get_app().render_counter
+        if self._filter_render_counter != render_counter:
+            self._filter_value = self.filter()
+            self._filter_render_counter = render_counter
+        return self._filter_value
+
+    def reset(self) ->None:
+        self.content.reset()
+
+    def preferred_width(self, max_available_width: int) ->Dimension:
+        if self._is_visible():
+            return self.content.preferred_width(max_available_width)
+        else:
+            return Dimension.zero()
+
+    def preferred_height(self, width: int, max_available_height: int
+        ) ->Dimension:
+        if self._is_visible():
+            return self.content.preferred_height(width, max_available_height)
+        else:
+            return Dimension.zero()
+
+    def write_to_screen(self, screen: Screen, mouse_handlers: MouseHandlers,
+        write_position: WritePosition, parent_style: str, erase_bg: bool,
+        z_index: (int | None)) ->None:
+        if self._is_visible():
+            return self.content.write_to_screen(screen, mouse_handlers,
+                write_position, parent_style, erase_bg, z_index)
+
+    def get_children(self) ->list[Container]:
+        return [self.content]
+
 
 class DynamicContainer(Container):
     """
@@ -944,6 +1160,8 @@ class DynamicContainer(Container):
         or any widget with a ``__pt_container__`` method.
     """
 
+    __slots__ = 'get_container', '__weakref__'
+
     def __init__(self, get_container: Callable[[], AnyContainer]) ->None:
         self.get_container = get_container
 
@@ -954,19 +1172,27 @@ class DynamicContainer(Container):
         We call `to_container`, because `get_container` can also return a
         widget with a ``__pt_container__`` method.
         """
-        return to_container(self.get_container())
+        # This is called several times per render, avoid the function call
+        # in the common case.
+        container = self.get_container()
+        if isinstance(container, Container):
+            return container
+        return to_container(container)
 
 
 def to_container(container: AnyContainer) ->Container:
     """
     Make sure that the given object is a :class:`.Container`.
     """
-    if isinstance(container, Container):
-        return container
-    elif hasattr(container, '__pt_container__'):
-        return to_container(container.__pt_container__())
-    else:
-        raise ValueError('Not a container object: %r' % (container,))
+    # Not memoized: `__pt_container__` can return a different container
+    # every time. Unwrap iteratively, with one attribute lookup per level.
+    value = container
+    while not isinstance(value, Container):
+        get_container = getattr(value, '__pt_container__', None)
+        if get_container is None:
+            raise ValueError('Not a container object: %r' % (value,))
+        value = get_container()
+    return value
 
 
 def to_window(container: AnyContainer) ->Window:
@@ -988,4 +1214,5 @@ def is_container(value: object) ->TypeGuard[AnyContainer]:
     Checks whether the given value is a container object
     (for use in assert statements).
     """
-    return isinstance(value, Container) or hasattr(value, '__pt_container__')
+    return isinstance(value, Container) or getattr(value,
+        '__pt_container__', None) is not None
@@ -3,13 +3,17 @@ Layout dimensions are used to give the minimum, maximum and preferred
 dimensions for containers and controls.
 """
 from __future__ import annotations
-from typing import TYPE_CHECKING, Any, Callable, Union
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Union
 __all__ = ['Dimension', 'D', 'sum_layout_dimensions',
     'max_layout_dimensions', 'AnyDimension', 'to_dimension', 'is_dimension']
 if TYPE_CHECKING:
     from typing_extensions import TypeGuard
 
 
+# Maximum size, used when no maximum was given.
+_MAX_SIZE = 1000 ** 10
+
+
 class Dimension:
     """
     Specified dimension (width/height) of a user control or window.
@@ -26,15 +30,18 @@ class Dimension:
                    and the other with a weight of 2, the second will always be
                    twice as big as the first, if the min/max values allow it.
     :param preferred: Preferred size.
+
+    Instances are never modified after creation, so common ones are shared.
+    (See :meth:`_intern`.)
     """
+    __slots__ = ('min', 'max', 'preferred', 'weight', 'min_specified',
+        'max_specified', 'preferred_specified', 'weight_specified')
 
     def __init__(self, min: (int | None)=None, max: (int | None)=None,
         weight: (int | None)=None, preferred: (int | None)=None) ->None:
-        if weight is not None:
-            assert weight >= 0
-        assert min is None or min >= 0
-        assert max is None or max >= 0
-        assert preferred is None or preferred >= 0
+        assert (min is None or min >= 0) and (max is None or max >= 0) and (
+            preferred is None or preferred >= 0) and (weight is None or
+            weight >= 0)
         self.min_specified = min is not None
         self.max_specified = max is not None
         self.preferred_specified = preferred is not None
@@ -42,21 +49,42 @@ class Dimension:
         if min is None:
             min = 0
         if max is None:
-            max = 1000 ** 10
-        if preferred is None:
-            preferred = min
+            max = _MAX_SIZE
         if weight is None:
             weight = 1
+        if max < min:
+            raise ValueError('Invalid Dimension: max < min.')
+
+        # Default to, and clamp between, min and max.
+        if preferred is None or preferred < min:
+            preferred = min
+        elif preferred > max:
+            preferred = max
+
         self.min = min
         self.max = max
         self.preferred = preferred
         self.weight = weight
-        if max < min:
-            raise ValueError('Invalid Dimension: max < min.')
-        if self.preferred < self.min:
-            self.preferred = self.min
-        if self.preferred > self.max:
-            self.preferred = self.max
+
+    @classmethod
+    def _intern(cls, min: (int | None)=None, max: (int | None)=None, weight:
+        (int | None)=None, preferred: (int | None)=None) ->Dimension:
+        """
+        Like the constructor, but return a shared instance for a combination
+        of arguments that was seen before.
+        """
+        if cls is not Dimension:
+            return cls(min=min, max=max, weight=weight, preferred=preferred)
+
+        key = min, max, weight, preferred
+        try:
+            return _interned[key]
+        except KeyError:
+            result = Dimension(min=min, max=max, weight=weight, preferred=
+                preferred)
+            if len(_interned) < _MAX_INTERNED:
+                _interned[key] = result
+            return result
 
     @classmethod
     def exact(cls, amount: int) ->Dimension:
@@ -64,7 +92,7 @@ class Dimension:
         Return a :class:`.Dimension` with an exact size. (min, max and
         preferred set to ``amount``).
         """
-        return cls(min=amount, max=amount, preferred=amount)
+        return cls._intern(min=amount, max=amount, preferred=amount)
 
     @classmethod
     def zero(cls) ->Dimension:
@@ -72,7 +100,7 @@ class Dimension:
         Create a dimension that represents a zero size. (Used for 'invisible'
         controls.)
         """
-        return cls(min=0, max=0, preferred=0)
+        return cls._intern(min=0, max=0, preferred=0)
 
     def is_zero(self) ->bool:
         """True if this `Dimension` represents a zero size."""
@@ -91,15 +119,26 @@ class Dimension:
         return 'Dimension(%s)' % ', '.join(fields)
 
 
-def sum_layout_dimensions(dimensions: list[Dimension]) ->Dimension:
+# Shared `Dimension` instances, by constructor arguments. (Bounded, in case
+# of many distinct sizes.)
+_interned: dict[tuple[int | None, int | None, int | None, int | None],
+    Dimension] = {}
+_MAX_INTERNED = 1024
+
+
+def sum_layout_dimensions(dimensions: Iterable[Dimension]) ->Dimension:
     """
     Sum a list of :class:`.Dimension` instances.
+    (Single pass, so this also accepts a generator.)
     """
-    min_sum = sum(d.min for d in dimensions)
-    max_sum = sum(d.max for d in dimensions)
-    preferred_sum = sum(d.preferred for d in dimensions)
-    weight_sum = sum(d.weight for d in dimensions)
-    
+    min_sum = max_sum = preferred_sum = weight_sum = 0
+
+    for d in dimensions:
+        min_sum += d.min
+        max_sum += d.max
+        preferred_sum += d.preferred
+        weight_sum += d.weight
+
     return Dimension(min=min_sum, max=max_sum, preferred=preferred_sum, weight=weight_sum)
 
 
@@ -110,13 +149,25 @@ def max_layout_dimensions(dimensions: list[Dimension]) ->Dimension:
     """
     if not dimensions:
         return Dimension.zero()
-    
-    return Dimension(
-        min=max(d.min for d in dimensions),
-        max=max(d.max for d in dimensions),
-        preferred=max(d.preferred for d in dimensions),
-        weight=max(d.weight for d in dimensions)
-    )
+
+    # One pass over the dimensions instead of one for every field.
+    first = dimensions[0]
+    min_ = first.min
+    max_ = first.max
+    preferred = first.preferred
+    weight = first.weight
+
+    for d in dimensions:
+        if d.min > min_:
+            min_ = d.min
+        if d.max > max_:
+            max_ = d.max
+        if d.preferred > preferred:
+            preferred = d.preferred
+        if d.weight > weight:
+            weight = d.weight
+
+    return Dimension(min=min_, max=max_, preferred=preferred, weight=weight)
 
 
 AnyDimension = Union[None, int, Dimension, Callable[[], Any]]
@@ -126,12 +177,13 @@ def to_dimension(value: AnyDimension) ->Dimension:
     """
     Turn the given object into a `Dimension` object.
     """
+    # Most common case first. The others return shared instances.
+    if isinstance(value, Dimension):
+        return value
     if value is None:
-        return Dimension()
+        return Dimension._intern()
     if isinstance(value, int):
         return Dimension.exact(value)
-    if isinstance(value, Dimension):
-        return value
     if callable(value):
         return to_dimension(value())
     raise ValueError(f"Cannot convert {value} to Dimension")
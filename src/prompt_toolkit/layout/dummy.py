@@ -3,6 +3,7 @@ Dummy layout. Used when somebody creates an `Application` without specifying a
 `Layout`.
 """
 from __future__ import annotations
+from functools import lru_cache
 from prompt_toolkit.formatted_text import HTML
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.key_binding.key_processor import KeyPressEvent
@@ -19,6 +20,24 @@ def create_dummy_layout() ->Layout:
     Create a dummy layout for use in an 'Application' that doesn't have a
     layout specified. When ENTER is pressed, the application quits.
     """
+    # The `Window` and `Layout` keep state (scroll position, focus), so these
+    # are created for every call. The text and key bindings are shared.
+    dummy_text, kb = _get_dummy_text_and_key_bindings()
+
+    window = Window(
+        FormattedTextControl(dummy_text, key_bindings=kb),
+        height=D(min=1),
+    )
+
+    return Layout(window)
+
+
+@lru_cache(maxsize=1)
+def _get_dummy_text_and_key_bindings() ->tuple[HTML, KeyBindings]:
+    """
+    Text and key bindings of the dummy layout. (Created on first use, not
+    at import time: parsing the HTML isn't free.)
+    """
     kb = KeyBindings()
 
     @kb.add('enter')
@@ -34,10 +53,4 @@ def create_dummy_layout() ->Layout:
         '</style>'
     )
 
-    window = Window(
-        FormattedTextControl(dummy_text),
-        height=D(min=1),
-        key_bindings=kb,
-    )
-
-    return Layout(window)
+    return dummy_text, kb
@@ -2,7 +2,8 @@
 Wrapper for the layout.
 """
 from __future__ import annotations
-from typing import Generator, Iterable, Union
+from collections import OrderedDict
+from typing import Any, Callable, Generator, Iterable, NamedTuple, Union
 from prompt_toolkit.buffer import Buffer
 from .containers import AnyContainer, ConditionalContainer, Container, Window, to_container
 from .controls import BufferControl, SearchBufferControl, UIControl
@@ -10,6 +11,17 @@ __all__ = ['Layout', 'InvalidLayoutError', 'walk']
 FocusableElement = Union[str, Buffer, UIControl, AnyContainer]
 
 
+class _WindowIndex(NamedTuple):
+    """
+    Lookup tables from a control, buffer or buffer name to the first window
+    that displays it. (Controls and buffers are keyed on `id()`; the windows
+    in the list that the index was built from keep them alive.)
+    """
+    by_control: dict[int, Window]
+    by_buffer: dict[int, Window]
+    by_buffer_name: dict[str, Window]
+
+
 class Layout:
     """
     The layout for a prompt_toolkit
@@ -24,12 +36,26 @@ class Layout:
     def __init__(self, container: AnyContainer, focused_element: (
         FocusableElement | None)=None) ->None:
         self.container = to_container(container)
-        self._stack: list[Window] = []
+        # Focus history, most recently focused window last. (Ordered set:
+        # focusing a window moves it to the end in constant time.)
+        self._stack: OrderedDict[Window, None] = OrderedDict()
+        # The last window of `_stack`. (Read for every key press, through
+        # `current_buffer` and `buffer_has_focus`.)
+        self._current_window: Window | None = None
         self.search_links: dict[SearchBufferControl, BufferControl] = {}
         self._child_to_parent: dict[Container, Container] = {}
+        self._child_to_parent_version = -1
+        # Bumped whenever the containers in the layout could have changed.
+        # Cached walk results are only valid for the version (and root
+        # container) they were built for.
+        self._version = 0
+        self._windows_cache: tuple[int, Container, list[Window]] | None = None
+        self._modal_area_cache: tuple[int, Container, Container, list[Window]
+            ] | None = None
+        self._window_index: tuple[list[Window], _WindowIndex] | None = None
         if focused_element is None:
             try:
-                self._stack.append(next(self.find_all_windows()))
+                self.current_window = next(self.find_all_windows())
             except StopIteration as e:
                 raise InvalidLayoutError(
                     'Invalid layout. The layout does not contain any Window object.'
@@ -51,6 +77,97 @@ class Layout:
             if isinstance(item, Window):
                 yield item
 
+    def _get_all_windows(self, refresh: bool=False) ->list[Window]:
+        """
+        List of all the windows in the layout, as of the current `_version`.
+
+        :param refresh: Walk the layout again, even if the cached list is
+            still valid.
+        """
+        cache = self._windows_cache
+        if not refresh and cache is not None and cache[0
+            ] == self._version and cache[1] is self.container:
+            return cache[2]
+        windows = list(self.find_all_windows())
+        self._windows_cache = self._version, self.container, windows
+        return windows
+
+    def _find_window(self, predicate: Callable[[Window], bool]) ->(Window |
+        None):
+        """
+        Return the first window for which `predicate` is true. Windows that
+        were added since the last invalidation are found as well: a miss in the
+        cached list triggers a new walk.
+        """
+        cache = self._windows_cache
+        for window in self._get_all_windows():
+            if predicate(window):
+                return window
+        if self._windows_cache is cache:
+            # The list came from the cache, walk again.
+            for window in self._get_all_windows(refresh=True):
+                if predicate(window):
+                    return window
+        return None
+
+    def _find_indexed_window(self, lookup: Callable[[_WindowIndex], Window |
+        None], is_match: Callable[[Window], bool]) ->(Window | None):
+        """
+        Return the window that `lookup` finds in the `_WindowIndex`, if it
+        still satisfies `is_match`. Like `_find_window`, a miss in an index
+        that was built from the cached list triggers a new walk.
+        """
+        cache = self._windows_cache
+        window = lookup(self._get_window_index())
+        if window is not None and is_match(window):
+            return window
+
+        if self._windows_cache is cache:
+            # Not found, or changed since the index was built. Walk again.
+            self._get_all_windows(refresh=True)
+            window = lookup(self._get_window_index())
+            if window is not None and is_match(window):
+                return window
+        return None
+
+    def _find_buffer_window(self, buffer_name: str) ->(Window | None):
+        """
+        Return the first window that displays the buffer with this name.
+        """
+        return self._find_indexed_window(lambda index: index.by_buffer_name
+            .get(buffer_name), lambda w: isinstance(w.content,
+            BufferControl) and w.content.buffer.name == buffer_name)
+
+    def _get_window_index(self) ->_WindowIndex:
+        """
+        Return the `_WindowIndex` for the windows of `_get_all_windows`. (Built
+        from, and valid as long as, that list.)
+        """
+        windows = self._get_all_windows()
+        cache = self._window_index
+        if cache is not None and cache[0] is windows:
+            return cache[1]
+
+        index = _WindowIndex({}, {}, {})
+        for w in windows:
+            content = w.content
+            index.by_control.setdefault(id(content), w)
+            if isinstance(content, BufferControl):
+                index.by_buffer.setdefault(id(content.buffer), w)
+                index.by_buffer_name.setdefault(content.buffer.name, w)
+        self._window_index = windows, index
+        return index
+
+    def invalidate(self) ->None:
+        """
+        Drop the cached walk results. Call this after changing the containers
+        in the layout.
+        """
+        self._version += 1
+        self._windows_cache = None
+        self._modal_area_cache = None
+        self._window_index = None
+
     def focus(self, value: FocusableElement) ->None:
         """
         Focus the given UI element.
@@ -64,28 +181,46 @@ class Layout:
           from this container that was focused most recent, or the very first
           focusable :class:`.Window` of the container.
         """
-        if isinstance(value, UIControl):
-            for window in self.find_all_windows():
-                if window.content == value:
-                    self.current_window = window
-                    return
-        elif isinstance(value, Buffer):
-            for window in self.find_all_windows():
-                if isinstance(window.content, BufferControl) and window.content.buffer == value:
-                    self.current_window = window
-                    return
-        elif isinstance(value, str):
-            for window in self.find_all_windows():
-                if isinstance(window.content, BufferControl) and window.content.buffer.name == value:
-                    self.current_window = window
-                    return
-        elif isinstance(value, Window):
-            self.current_window = value
-        elif isinstance(value, Container):
-            for window in self.find_all_windows():
-                if window in value.get_children():
-                    self.current_window = window
-                    return
+        # Dispatch on the type. (A dictionary lookup for every class in the
+        # MRO, instead of a chain of `isinstance` calls.)
+        for cls in type(value).__mro__:
+            handler = _FOCUS_HANDLERS.get(cls)
+            if handler is not None:
+                handler(self, value)
+                return
+
+        # Classes that were registered as a virtual subclass of an ABC.
+        for cls, handler in _FOCUS_HANDLERS.items():
+            if isinstance(value, cls):
+                handler(self, value)
+                return
+
+    def _focus_control(self, control: UIControl) ->None:
+        window = self._find_indexed_window(lambda index: index.by_control.
+            get(id(control)), lambda w: w.content is control)
+        if window is not None:
+            self.current_window = window
+
+    def _focus_buffer(self, buffer: Buffer) ->None:
+        window = self._find_indexed_window(lambda index: index.by_buffer.
+            get(id(buffer)), lambda w: isinstance(w.content, BufferControl) and
+            w.content.buffer is buffer)
+        if window is not None:
+            self.current_window = window
+
+    def _focus_buffer_name(self, buffer_name: str) ->None:
+        window = self._find_buffer_window(buffer_name)
+        if window is not None:
+            self.current_window = window
+
+    def _focus_window(self, window: Window) ->None:
+        self.current_window = window
+
+    def _focus_container(self, container: Container) ->None:
+        children = container.get_children()
+        window = self._find_window(lambda w: w in children)
+        if window is not None:
+            self.current_window = window
 
     def has_focus(self, value: FocusableElement) ->bool:
         """
@@ -93,9 +228,9 @@ class Layout:
         :param value: :class:`.UIControl` or :class:`.Window` instance.
         """
         if isinstance(value, UIControl):
-            return self.current_control == value
+            return self._current_window.content is value
         elif isinstance(value, Window):
-            return self.current_window == value
+            return self._current_window is value
         return False
 
     @property
@@ -115,16 +250,14 @@ class Layout:
     @property
     def current_window(self) ->Window:
         """Return the :class:`.Window` object that is currently focused."""
-        return self._stack[-1] if self._stack else None
+        return self._current_window
 
     @current_window.setter
     def current_window(self, value: Window) ->None:
         """Set the :class:`.Window` object to be currently focused."""
-        if value not in self._stack:
-            self._stack.append(value)
-        else:
-            self._stack.remove(value)
-            self._stack.append(value)
+        self._stack[value] = None
+        self._stack.move_to_end(value)
+        self._current_window = value
 
     @property
     def is_searching(self) ->bool:
@@ -141,26 +274,46 @@ class Layout:
                 return buffer_control
         return None
 
-    def get_focusable_windows(self) ->Iterable[Window]:
+    def _get_modal_area_windows(self) ->list[Window]:
+        """
+        List of all the windows in the current 'modal' area, as of the current
+        `_version`.
+        """
+        root = self._get_modal_root()
+        cache = self._modal_area_cache
+        if cache is not None and cache[0] == self._version and cache[1
+            ] is self.container and cache[2] is root:
+            return cache[3]
+        windows = [w for w in _walk_modal_area(root) if isinstance(w, Window)]
+        self._modal_area_cache = self._version, self.container, root, windows
+        return windows
+
+    def get_focusable_windows(self) ->list[Window]:
         """
         Return all the :class:`.Window` objects which are focusable (in the
         'modal' area).
         """
-        return (w for w in self.walk_through_modal_area() if isinstance(w, Window) and w.content.is_focusable())
+        # Whether a window is focusable can change at any time, only the
+        # structure of the layout is cached.
+        return [w for w in self._get_modal_area_windows() if w.content.
+            is_focusable()]
 
     def get_visible_focusable_windows(self) ->list[Window]:
         """
         Return a list of :class:`.Window` objects that are focusable.
         """
-        return [w for w in self.get_focusable_windows() if w.filter()]
+        # One pass over the cached modal area, both conditions are live.
+        return [w for w in self._get_modal_area_windows() if w.content.
+            is_focusable() and w.filter()]
 
     @property
     def current_buffer(self) ->(Buffer | None):
         """
         The currently focused :class:`~.Buffer` or `None`.
         """
-        if isinstance(self.current_control, BufferControl):
-            return self.current_control.buffer
+        control = self.current_control
+        if isinstance(control, BufferControl):
+            return control.buffer
         return None
 
     def get_buffer_by_name(self, buffer_name: str) ->(Buffer | None):
@@ -168,9 +321,9 @@ class Layout:
         Look in the layout for a buffer with the given name.
         Return `None` when nothing was found.
         """
-        for window in self.find_all_windows():
-            if isinstance(window.content, BufferControl) and window.content.buffer.name == buffer_name:
-                return window.content.buffer
+        window = self._find_buffer_window(buffer_name)
+        if window is not None:
+            return window.content.buffer
         return None
 
     @property
@@ -187,68 +340,134 @@ class Layout:
         """
         Get the :class:`.UIControl` to previously had the focus.
         """
-        return self._stack[-2].content if len(self._stack) > 1 else None
+        if len(self._stack) > 1:
+            windows = reversed(self._stack)
+            next(windows)
+            return next(windows).content
+        return None
 
     def focus_last(self) ->None:
         """
         Give the focus to the last focused control.
         """
         if len(self._stack) > 1:
-            self._stack.pop()
+            self._stack.popitem()
+            self._current_window = next(reversed(self._stack))
 
     def focus_next(self) ->None:
         """
         Focus the next visible/focusable Window.
         """
-        windows = self.get_visible_focusable_windows()
-        if not windows:
-            return
-        try:
-            index = windows.index(self.current_window)
-            self.focus(windows[(index + 1) % len(windows)])
-        except ValueError:
-            # If the current window is not in the list, focus the first one
-            self.focus(windows[0])
+        self._focus_relative(1)
 
     def focus_previous(self) ->None:
         """
         Focus the previous visible/focusable Window.
         """
+        self._focus_relative(-1)
+
+    def _focus_relative(self, offset: int) ->None:
+        # (Which windows are visible and focusable can change at any time, so
+        # the list, and the position in it, are computed again every time.)
         windows = self.get_visible_focusable_windows()
         if not windows:
             return
         try:
             index = windows.index(self.current_window)
-            self.focus(windows[(index - 1) % len(windows)])
         except ValueError:
-            # If the current window is not in the list, focus the last one
-            self.focus(windows[-1])
+            # If the current window is not in the list, focus the first one
+            # (next) or the last one (previous).
+            index = -1 if offset > 0 else 0
+        self.current_window = windows[(index + offset) % len(windows)]
 
     def walk(self) ->Iterable[Container]:
         """
         Walk through all the layout nodes (and their children) and yield them.
         """
-        pass
+        yield from _walk_all(self.container)
 
     def walk_through_modal_area(self) ->Iterable[Container]:
         """
         Walk through all the containers which are in the current 'modal' part
         of the layout.
         """
-        pass
+        yield from _walk_modal_area(self._get_modal_root())
+
+    def _get_modal_root(self) ->Container:
+        """
+        Return the root of the 'modal' area that contains the current window.
+        """
+        # Go up in the tree, and find the root. (it will be a modal.)
+        root: Container = self.current_window
+        child_to_parent = self._get_child_to_parent()
+        while not root.is_modal() and root in child_to_parent:
+            root = child_to_parent[root]
+        return root
 
     def update_parents_relations(self) ->None:
         """
         Update child->parent relationships mapping.
+
+        (This is called after every render. The mapping is only rebuilt when
+        it's used next.)
+        """
+        # This also refreshes the cached walk results.
+        self.invalidate()
+
+    def _get_child_to_parent(self) ->dict[Container, Container]:
+        """
+        Return the child->parent mapping, built again if the layout was
+        invalidated since it was last built.
         """
-        pass
+        if self._child_to_parent_version != self._version:
+            parents: dict[Container, Container] = {}
+            stack = [self.container]
+            pop = stack.pop
+            extend = stack.extend
+
+            while stack:
+                e = pop()
+                children = e.get_children()
+                if children:
+                    # All the children at once, without a Python level loop.
+                    parents.update(dict.fromkeys(children, e))
+                    extend(children)
+
+            self._child_to_parent = parents
+            self._child_to_parent_version = self._version
+        return self._child_to_parent
 
     def get_parent(self, container: Container) ->(Container | None):
         """
         Return the parent container for the given container, or ``None``, if it
         wasn't found.
         """
-        pass
+        return self._get_child_to_parent().get(container)
+
+
+def _walk_modal_area(root: Container) ->Iterable[Container]:
+    """
+    Like `_walk_all`, but don't descend into modal containers below `root`.
+    Those are a 'modal' area of their own.
+    """
+    stack = [root]
+    pop = stack.pop
+    append = stack.append
+
+    while stack:
+        cont = pop()
+        yield cont
+        for c in reversed(cont.get_children()):
+            if not c.is_modal():
+                append(c)
+
+
+# `Layout.focus` handlers, by type of the focused value. (Order matters for
+# the `isinstance` fallback: `Window` before `Container`.)
+_FOCUS_HANDLERS: dict[type, Callable[[Layout, Any], None]] = {UIControl:
+    Layout._focus_control, Buffer: Layout._focus_buffer, str: Layout.
+    _focus_buffer_name, Window: Layout._focus_window, Container: Layout.
+    _focus_container}
 
 
 class InvalidLayoutError(Exception):
@@ -259,11 +478,48 @@ def walk(container: Container, skip_hidden: bool=False) ->Iterable[Container]:
     """
     Walk through layout, starting at this container.
     """
-    def walk_recursive(cont):
-        yield cont
-        if hasattr(cont, 'get_children'):
-            for child in cont.get_children():
-                if not skip_hidden or not isinstance(child, ConditionalContainer) or child.filter():
-                    yield from walk_recursive(child)
+    return _walk_visible(container) if skip_hidden else _walk_all(container)
+
+
+# The two variants of `walk`, so that the inner loops don't have to test
+# `skip_hidden`. Both are iterative depth-first walks. Children are pushed in
+# reverse, so that they are yielded in the same order as a recursive walk
+# would.
+
 
-    yield from walk_recursive(container)
+def _walk_all(container: Container) ->Iterable[Container]:
+    stack = [container]
+    pop = stack.pop
+    extend = stack.extend
+
+    while stack:
+        cont = pop()
+        yield cont
+        get_children = getattr(cont, 'get_children', None)
+        if get_children is not None:
+            extend(reversed(get_children()))
+
+
+def _walk_visible(container: Container) ->Iterable[Container]:
+    stack = [container]
+    pop = stack.pop
+    append = stack.append
+    # Filters that are shared between several conditional containers are
+    # only evaluated once during a walk. (Keyed on `id()`, the containers
+    # keep the filters alive.)
+    filter_results: dict[int, bool] = {}
+
+    while stack:
+        cont = pop()
+        yield cont
+        get_children = getattr(cont, 'get_children', None)
+        if get_children is not None:
+            for c in reversed(get_children()):
+                if isinstance(c, ConditionalContainer):
+                    f = c.filter
+                    visible = filter_results.get(id(f))
+                    if visible is None:
+                        visible = filter_results[id(f)] = f()
+                    if not visible:
+                        continue
+                append(c)
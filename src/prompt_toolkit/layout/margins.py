@@ -5,7 +5,7 @@ from __future__ import annotations
 from abc import ABCMeta, abstractmethod
 from typing import TYPE_CHECKING, Callable
 from prompt_toolkit.filters import FilterOrBool, to_filter
-from prompt_toolkit.formatted_text import StyleAndTextTuples, fragment_list_to_text, to_formatted_text
+from prompt_toolkit.formatted_text import AnyFormattedText, StyleAndTextTuples, fragment_list_width, to_formatted_text
 from prompt_toolkit.utils import get_cwidth
 from .controls import UIContent
 if TYPE_CHECKING:
@@ -14,6 +14,16 @@ __all__ = ['Margin', 'NumberedMargin', 'ScrollbarMargin',
     'ConditionalMargin', 'PromptMargin']
 
 
+def _get_formatted_text_width(formatted_text: AnyFormattedText) ->int:
+    """
+    Width of the given formatted text, in cells. (The widths of the fragments
+    are added up, the text isn't joined first.)
+    """
+    if isinstance(formatted_text, str):
+        return get_cwidth(formatted_text)
+    return fragment_list_width(to_formatted_text(formatted_text))
+
+
 class Margin(metaclass=ABCMeta):
     """
     Base interface for a margin.
@@ -120,30 +130,16 @@ class PromptMargin(Margin):
 
     def get_width(self, get_ui_content: Callable[[], UIContent]) ->int:
         """Width to report to the `Window`."""
-        # Get the prompt text
-        prompt_text = fragment_list_to_text(to_formatted_text(self.get_prompt()))
-        
-        # Calculate the width of the prompt
-        prompt_width = get_cwidth(prompt_text)
-        
-        # If there's a continuation function, calculate its maximum width
-        if self.get_continuation:
-            ui_content = get_ui_content()
-            line_count = ui_content.line_count
-            
-            # Check width for each line (excluding the first line)
-            continuation_widths = [
-                get_cwidth(fragment_list_to_text(to_formatted_text(
-                    self.get_continuation(prompt_width, i, False)
-                )))
-                for i in range(1, line_count)
-            ]
-            
-            # Get the maximum width of continuation lines
-            max_continuation_width = max(continuation_widths) if continuation_widths else 0
-            
-            # Return the maximum of prompt width and continuation width
-            return max(prompt_width, max_continuation_width)
-        
-        # If there's no continuation function, just return the prompt width
-        return prompt_width
+        prompt_width = _get_formatted_text_width(self.get_prompt())
+
+        get_continuation = self.get_continuation
+        if get_continuation is None:
+            return prompt_width
+
+        # The continuation can depend on the line number, so every line is
+        # measured. (`get_cwidth` is memoized per string, repeated
+        # continuations cost a dictionary lookup.)
+        line_count = get_ui_content().line_count
+        return max(prompt_width, max((_get_formatted_text_width(
+            get_continuation(prompt_width, i, False)) for i in range(1,
+            line_count)), default=0))
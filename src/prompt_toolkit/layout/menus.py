@@ -1,16 +1,15 @@
 from __future__ import annotations
 import math
-from itertools import zip_longest
-from typing import TYPE_CHECKING, Callable, Iterable, Sequence, TypeVar, cast
-from weakref import WeakKeyDictionary
+from typing import TYPE_CHECKING, Callable, Generic, NamedTuple, TypeVar
+from weakref import ref
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.buffer import CompletionState
+from prompt_toolkit.cache import SimpleCache
 from prompt_toolkit.completion import Completion
 from prompt_toolkit.data_structures import Point
 from prompt_toolkit.filters import Condition, FilterOrBool, has_completions, is_done, to_filter
-from prompt_toolkit.formatted_text import StyleAndTextTuples, fragment_list_width, to_formatted_text
+from prompt_toolkit.formatted_text import StyleAndTextTuples
 from prompt_toolkit.key_binding.key_processor import KeyPressEvent
-from prompt_toolkit.layout.utils import explode_text_fragments
 from prompt_toolkit.mouse_events import MouseEvent, MouseEventType
 from prompt_toolkit.utils import get_cwidth
 from .containers import ConditionalContainer, HSplit, ScrollOffsets, Window
@@ -21,6 +20,107 @@ if TYPE_CHECKING:
     from prompt_toolkit.key_binding.key_bindings import KeyBindings, NotImplementedOrNone
 __all__ = ['CompletionsMenu', 'MultiColumnCompletionsMenu']
 E = KeyPressEvent
+_T = TypeVar('_T')
+
+_COMPLETION_STYLE = 'class:completion-menu.completion'
+_CURRENT_COMPLETION_STYLE = _COMPLETION_STYLE + '.current'
+
+# Padding strings for menu items, shared instead of created for every item
+# that is rendered.
+_SPACES = tuple(' ' * i for i in range(201))
+
+
+# Menu items that had to be trimmed, by (style, text, width). (Long
+# completions are trimmed again on every render otherwise.)
+_trimmed_text_cache: SimpleCache[tuple[str, str, int], tuple[
+    StyleAndTextTuples, int]] = SimpleCache(maxsize=128)
+
+
+def _spaces(count: int) ->str:
+    """
+    Return a string of `count` spaces.
+    """
+    if 0 <= count < len(_SPACES):
+        return _SPACES[count]
+    return ' ' * count
+
+
+def _fast_cwidth(text: str) ->int:
+    """
+    Like `get_cwidth`, but without the per-character lookups for printable
+    ASCII text (which is what most completions are), where every character
+    takes one cell.
+    """
+    if text.isascii() and text.isprintable():
+        return len(text)
+    return get_cwidth(text)
+
+
+class _CompletionWidths(NamedTuple):
+    """
+    Widths computed once for the completions of a `CompletionState`.
+    """
+    max_display_width: int
+    max_meta_width: int
+    has_meta: bool
+    #: Width of the display text of every completion, in the same order.
+    display_widths: list[int]
+
+
+class _CompletionStateCache(Generic[_T]):
+    """
+    Holds a value computed for the most recent `CompletionState`.
+
+    A new `CompletionState` is created whenever the completions change, and
+    the old one isn't used again, so remembering the last one is enough. (The
+    state is held through a weak reference; a new state that reuses the
+    address of a dead one doesn't match.)
+
+    Completions that are still being generated are appended to the list of
+    the existing state, so the value is only valid for the number of
+    completions it was computed for.
+    """
+    __slots__ = '_state_ref', '_completion_count', '_value'
+
+    def __init__(self) ->None:
+        self._state_ref: ref[CompletionState] | None = None
+        self._completion_count = 0
+        self._value: _T | None = None
+
+    def get(self, complete_state: CompletionState) ->(_T | None):
+        """
+        Return the value stored for this state, or `None`.
+        """
+        state_ref = self._state_ref
+        if (state_ref is not None and state_ref() is complete_state and
+                self._completion_count == len(complete_state.completions)):
+            return self._value
+        return None
+
+    def set(self, complete_state: CompletionState, value: _T) ->None:
+        self._state_ref = ref(complete_state)
+        self._completion_count = len(complete_state.completions)
+        self._value = value
+
+
+class _RenderCompleteState:
+    """
+    The `complete_state` of the current buffer, looked up once per render.
+    (The menu controls need it in `preferred_width`, `preferred_height` and
+    `create_content`. It can't change while rendering.)
+    """
+    __slots__ = '_render_counter', '_complete_state'
+
+    def __init__(self) ->None:
+        self._render_counter = -1
+        self._complete_state: CompletionState | None = None
+
+    def get(self) ->(CompletionState | None):
+        app = get_app()
+        if self._render_counter != app.render_counter:
+            self._render_counter = app.render_counter
+            self._complete_state = app.current_buffer.complete_state
+        return self._complete_state
 
 
 class CompletionsMenuControl(UIControl):
@@ -34,11 +134,41 @@ class CompletionsMenuControl(UIControl):
     """
     MIN_WIDTH = 7
 
+    def __init__(self) ->None:
+        # These only depend on the completions, so they're computed once for
+        # every `CompletionState`.
+        self._widths_for_completion_state: _CompletionStateCache[
+            _CompletionWidths] = _CompletionStateCache()
+        self._render_complete_state = _RenderCompleteState()
+
+    def _get_widths(self, complete_state: CompletionState
+        ) ->_CompletionWidths:
+        """
+        Return the `_CompletionWidths` for this `CompletionState`.
+        """
+        result = self._widths_for_completion_state.get(complete_state)
+        if result is not None:
+            return result
+
+        display_widths = [_fast_cwidth(c.display_text) for c in
+            complete_state.completions]
+        max_meta_width = 0
+        has_meta = False
+        for c in complete_state.completions:
+            if c.display_meta:
+                has_meta = True
+                max_meta_width = max(max_meta_width, _fast_cwidth(c.display_meta_text))
+
+        result = _CompletionWidths(max(display_widths, default=0),
+            max_meta_width, has_meta, display_widths)
+        self._widths_for_completion_state.set(complete_state, result)
+        return result
+
     def create_content(self, width: int, height: int) ->UIContent:
         """
         Create a UIContent object for this control.
         """
-        complete_state = get_app().current_buffer.complete_state
+        complete_state = self._render_complete_state.get()
         if complete_state is None:
             return UIContent()
 
@@ -48,12 +178,15 @@ class CompletionsMenuControl(UIControl):
         # Calculate width of completions menu.
         menu_width = self._get_menu_width(width, complete_state)
         menu_meta_width = self._get_menu_meta_width(width, complete_state)
-        show_meta = self._show_meta(complete_state)
+        widths = self._get_widths(complete_state)
+        show_meta = widths.has_meta
+        display_widths = widths.display_widths
 
         def get_line(i):
             c = completions[i]
             is_current_completion = (i == index)
-            result = _get_menu_item_fragments(c, is_current_completion, menu_width, space_after=show_meta)
+            result = _get_menu_item_fragments(c, is_current_completion,
+                menu_width, space_after=show_meta, text_width=display_widths[i])
 
             if show_meta:
                 result += _get_menu_item_fragments(c.display_meta, is_current_completion, menu_meta_width)
@@ -68,22 +201,23 @@ class CompletionsMenuControl(UIControl):
         """
         Return ``True`` if we need to show a column with meta information.
         """
-        return any(c.display_meta for c in complete_state.completions)
+        return self._get_widths(complete_state).has_meta
 
     def _get_menu_width(self, max_width: int, complete_state: CompletionState
         ) ->int:
         """
         Return the width of the main column.
         """
-        return min(max_width, max(self.MIN_WIDTH, max(get_cwidth(c.display) for c in complete_state.completions) + 2))
+        return min(max_width, max(self.MIN_WIDTH, self._get_widths(complete_state).max_display_width + 2))
 
     def _get_menu_meta_width(self, max_width: int, complete_state:
         CompletionState) ->int:
         """
         Return the width of the meta column.
         """
-        if self._show_meta(complete_state):
-            return min(max_width // 2, max(get_cwidth(c.display_meta) for c in complete_state.completions if c.display_meta))
+        widths = self._get_widths(complete_state)
+        if widths.has_meta:
+            return min(max_width // 2, widths.max_meta_width)
         return 0
 
     def mouse_handler(self, mouse_event: MouseEvent) ->NotImplementedOrNone:
@@ -116,27 +250,36 @@ class CompletionsMenuControl(UIControl):
 
 
 def _get_menu_item_fragments(completion: Completion, is_current_completion:
-    bool, width: int, space_after: bool=False) ->StyleAndTextTuples:
+    bool, width: int, space_after: bool=False, text_width: (int | None)=None
+    ) ->StyleAndTextTuples:
     """
     Get the style/text tuples for a menu item, styled and trimmed to the given
     width.
+
+    :param text_width: The width of the display text, when it's known already.
+        Text that fits doesn't have to go through the trimming.
     """
-    style = 'class:completion-menu.completion'
     if is_current_completion:
-        style += '.current'
-
-    text = completion.display
-    text, text_width = _trim_formatted_text([(style, text)], width)
-
+        style = _CURRENT_COMPLETION_STYLE
+    else:
+        style = _COMPLETION_STYLE
+
+    display_text = completion.display_text
+    if text_width is not None and text_width <= width:
+        text: StyleAndTextTuples = [(style, display_text)]
+    else:
+        trimmed, text_width = _trimmed_text_cache.get((style, display_text,
+            width), lambda : _trim_formatted_text([(style, display_text)],
+            width))
+        text = list(trimmed)  # The padding is appended below.
+
+    # Padding and the trailing space go into a single fragment.
     padding = width - text_width
     if space_after:
-        padding -= 1
+        padding = max(0, padding - 1) + 1
 
     if padding > 0:
-        text.append((style, ' ' * padding))
-
-    if space_after:
-        text.append((style, ' '))
+        text.append((style, _spaces(padding)))
 
     return text
 
@@ -150,17 +293,40 @@ def _trim_formatted_text(formatted_text: StyleAndTextTuples, max_width: int
     result: StyleAndTextTuples = []
     current_width = 0
 
+    # Characters are collected per style and flushed as one fragment when the
+    # style changes, rather than creating a fragment for every character.
+    current_style = ''
+    buf: list[str] = []
+
     for style, text in formatted_text:
+        if style != current_style:
+            if buf:
+                result.append((current_style, ''.join(buf)))
+                buf = []
+            current_style = style
+
+        # Printable ASCII that fits entirely doesn't need a width lookup for
+        # every character.
+        if (text.isascii() and text.isprintable() and
+                len(text) <= max_width - current_width):
+            buf.append(text)
+            current_width += len(text)
+            continue
+
         for c in text:
             char_width = get_cwidth(c)
             if current_width + char_width > max_width:
-                result.append((style, '...'))
+                buf.append('...')
+                result.append((style, ''.join(buf)))
                 current_width += 3
                 return result, current_width
 
-            result.append((style, c))
+            buf.append(c)
             current_width += char_width
 
+    if buf:
+        result.append((current_style, ''.join(buf)))
+
     return result, current_width
 
 
@@ -210,12 +376,16 @@ class MultiColumnCompletionMenuControl(UIControl):
         self.min_rows = min_rows
         self.suggested_max_column_width = suggested_max_column_width
         self.scroll = 0
-        self._column_width_for_completion_state: WeakKeyDictionary[
-            CompletionState, tuple[int, int]] = WeakKeyDictionary()
+        self._render_complete_state = _RenderCompleteState()
+        self._column_width_for_completion_state: _CompletionStateCache[tuple
+            [int, int, list[int]]] = _CompletionStateCache()
         self._rendered_rows = 0
         self._rendered_columns = 0
         self._total_columns = 0
-        self._render_pos_to_completion: dict[tuple[int, int], Completion] = {}
+        # The completion in every rendered cell, row by row. (Indexed by
+        # `row * _rendered_columns + column`.)
+        self._render_pos_to_completion: list[Completion | None] = []
+        self._render_column_width = 0
         self._render_left_arrow = False
         self._render_right_arrow = False
         self._render_width = 0
@@ -225,7 +395,7 @@ class MultiColumnCompletionMenuControl(UIControl):
         Preferred width: prefer to use at least min_rows, but otherwise as much
         as possible horizontally.
         """
-        complete_state = get_app().current_buffer.complete_state
+        complete_state = self._render_complete_state.get()
         if complete_state is None:
             return 0
 
@@ -246,7 +416,7 @@ class MultiColumnCompletionMenuControl(UIControl):
         """
         Preferred height: as much as needed in order to display all the completions.
         """
-        complete_state = get_app().current_buffer.complete_state
+        complete_state = self._render_complete_state.get()
         if complete_state is None:
             return 0
 
@@ -259,37 +429,50 @@ class MultiColumnCompletionMenuControl(UIControl):
         """
         Create a UIContent object for this menu.
         """
-        complete_state = get_app().current_buffer.complete_state
+        complete_state = self._render_complete_state.get()
         if complete_state is None:
             return UIContent()
 
-        column_width = self._get_column_width(complete_state)
-        self._render_pos_to_completion = {}
+        column_width, _, display_widths = self._get_column_widths(complete_state)
         self._render_left_arrow = False
         self._render_right_arrow = False
         self._render_width = width
+        self._render_column_width = column_width
 
         visible_columns = max(1, (width - self._required_margin) // column_width)
         visible_rows = height
+        self._render_pos_to_completion = [None] * (visible_rows *
+            visible_columns)
 
-        columns = []
-        for i in range(visible_columns):
-            col_start = i * visible_rows - self.scroll
-            col_end = (i + 1) * visible_rows - self.scroll
-            columns.append(complete_state.completions[col_start:col_end])
+        completions = complete_state.completions
+        complete_index = complete_state.complete_index
+        scroll = self.scroll
+
+        # Computed once, rather than for every cell of every line.
+        render_pos_to_completion = self._render_pos_to_completion
+        item_width = column_width - 1
+        empty_cell = ('', _spaces(column_width))
 
         def get_line(y):
             result = []
-            for x, column in enumerate(columns):
-                if y < len(column):
-                    completion = column[y]
-                    style = 'class:completion-menu.completion'
-                    if complete_state.complete_index == self.scroll + x * visible_rows + y:
-                        style += '.current'
-                    result.extend(_get_menu_item_fragments(completion, False, column_width - 1, True))
-                    self._render_pos_to_completion[x, y] = completion
-                else:
-                    result.append(('', ' ' * column_width))
+            # Index of the completion in the first visible column of this row.
+            # Every next column is `visible_rows` further, so the completions
+            # of this row are one (bounded) slice with that step.
+            first = scroll + y
+            last = first + visible_rows * visible_columns
+            row_completions = completions[first:last:visible_rows]
+            row_widths = display_widths[first:last:visible_rows]
+            row_start = y * visible_columns
+
+            index = first
+            for x, completion in enumerate(row_completions):
+                result.extend(_get_menu_item_fragments(completion, index ==
+                    complete_index, item_width, True, text_width=row_widths[x]))
+                render_pos_to_completion[row_start + x] = completion
+                index += visible_rows
+
+            # Columns past the last completion.
+            result.extend([empty_cell] * (visible_columns - len(row_completions)))
             return result
 
         self._rendered_rows = visible_rows
@@ -310,56 +493,89 @@ class MultiColumnCompletionMenuControl(UIControl):
         """
         Return the width of each column.
         """
-        if completion_state in self._column_width_for_completion_state:
-            return self._column_width_for_completion_state[completion_state][0]
+        return self._get_column_widths(completion_state)[0]
+
+    def _get_column_widths(self, completion_state: CompletionState) ->tuple[
+        int, int, list[int]]:
+        """
+        Return (column_width, max_width, display_widths): the width of each
+        column, of the longest completion, and of every completion.
+        """
+        result = self._column_width_for_completion_state.get(completion_state)
+        if result is not None:
+            return result
 
-        max_width = max(get_cwidth(c.display) for c in completion_state.completions)
-        result = max(self.suggested_max_column_width, max_width)
-        self._column_width_for_completion_state[completion_state] = (result, max_width)
+        display_widths = [_fast_cwidth(c.display_text) for c in
+            completion_state.completions]
+        max_width = max(display_widths, default=0)
+        result = max(self.suggested_max_column_width, max_width
+            ), max_width, display_widths
+        self._column_width_for_completion_state.set(completion_state, result)
         return result
 
+    def _clamp_scroll(self, delta: int) ->None:
+        """
+        Scroll by `delta` completions, without scrolling before the first or
+        past the last column.
+        """
+        limit = max(0, (self._total_columns - self._rendered_columns) * self
+            ._rendered_rows)
+        self.scroll = min(max(0, self.scroll + delta), limit)
+
     def mouse_handler(self, mouse_event: MouseEvent) ->NotImplementedOrNone:
         """
         Handle scroll and click events.
         """
-        if mouse_event.event_type == MouseEventType.SCROLL_DOWN:
-            self.scroll += self._rendered_rows
-            self.scroll = min(self.scroll, (self._total_columns - self._rendered_columns) * self._rendered_rows)
-        elif mouse_event.event_type == MouseEventType.SCROLL_UP:
-            self.scroll -= self._rendered_rows
-            self.scroll = max(0, self.scroll)
-        elif mouse_event.event_type == MouseEventType.MOUSE_UP:
+        event_type = mouse_event.event_type
+        rows = self._rendered_rows
+
+        if event_type == MouseEventType.SCROLL_DOWN:
+            self._clamp_scroll(rows)
+        elif event_type == MouseEventType.SCROLL_UP:
+            self._clamp_scroll(-rows)
+        elif event_type == MouseEventType.MOUSE_UP:
             x = mouse_event.position.x
             y = mouse_event.position.y
 
             if x == 0 and self._render_left_arrow:
-                self.scroll -= self._rendered_rows
-                self.scroll = max(0, self.scroll)
+                self._clamp_scroll(-rows)
             elif x == self._render_width - 1 and self._render_right_arrow:
-                self.scroll += self._rendered_rows
-                self.scroll = min(self.scroll, (self._total_columns - self._rendered_columns) * self._rendered_rows)
-            elif (x, y) in self._render_pos_to_completion:
-                completion = self._render_pos_to_completion[x, y]
-                get_app().current_buffer.apply_completion(completion)
+                self._clamp_scroll(rows)
+            else:
+                completion = self._get_completion_at(x, y)
+                if completion is not None:
+                    get_app().current_buffer.apply_completion(completion)
 
         return None
 
+    def _get_completion_at(self, x: int, y: int) ->(Completion | None):
+        """
+        Return the completion that was rendered at this position, if any.
+        """
+        column_width = self._render_column_width
+        if column_width <= 0 or x < 0 or not 0 <= y < self._rendered_rows:
+            return None
+        column = x // column_width
+        if column >= self._rendered_columns:
+            return None
+        return self._render_pos_to_completion[y * self._rendered_columns +
+            column]
+
     def get_key_bindings(self) ->KeyBindings:
         """
         Expose key bindings that handle the left/right arrow keys when the menu
         is displayed.
         """
+        from prompt_toolkit.key_binding.key_bindings import KeyBindings
         kb = KeyBindings()
 
         @kb.add('left', filter=~has_completions)
-        def _(event):
-            self.scroll -= self._rendered_rows
-            self.scroll = max(0, self.scroll)
+        def _(event: E) ->None:
+            self._clamp_scroll(-self._rendered_rows)
 
         @kb.add('right', filter=~has_completions)
-        def _(event):
-            self.scroll += self._rendered_rows
-            self.scroll = min(self.scroll, (self._total_columns - self._rendered_columns) * self._rendered_rows)
+        def _(event: E) ->None:
+            self._clamp_scroll(self._rendered_rows)
 
         return kb
 
@@ -398,6 +614,11 @@ class _SelectedCompletionMetaControl(UIControl):
     Control that shows the meta information of the selected completion.
     """
 
+    def __init__(self) ->None:
+        self._max_meta_width_for_completion_state: _CompletionStateCache[int
+            ] = _CompletionStateCache()
+        self._render_complete_state = _RenderCompleteState()
+
     def preferred_width(self, max_available_width: int) ->(int | None):
         """
         Report the width of the longest meta text as the preferred width of this control.
@@ -406,9 +627,15 @@ class _SelectedCompletionMetaControl(UIControl):
         layout doesn't change when we select another completion (E.g. that
         completions are suddenly shown in more or fewer columns.)
         """
-        complete_state = get_app().current_buffer.complete_state
+        complete_state = self._render_complete_state.get()
         if complete_state is None:
             return None
 
-        max_meta_width = max(get_cwidth(c.display_meta) for c in complete_state.completions if c.display_meta)
+        max_meta_width = self._max_meta_width_for_completion_state.get(
+            complete_state)
+        if max_meta_width is None:
+            max_meta_width = max((_fast_cwidth(c.display_meta_text) for c in
+                complete_state.completions if c.display_meta), default=0)
+            self._max_meta_width_for_completion_state.set(complete_state,
+                max_meta_width)
         return min(max_meta_width, max_available_width)
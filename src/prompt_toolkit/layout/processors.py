@@ -8,12 +8,13 @@ fragment types.
 from __future__ import annotations
 import re
 from abc import ABCMeta, abstractmethod
+from bisect import bisect_right
 from typing import TYPE_CHECKING, Callable, Hashable, cast
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.cache import SimpleCache
 from prompt_toolkit.document import Document
 from prompt_toolkit.filters import FilterOrBool, to_filter, vi_insert_multiple_mode
-from prompt_toolkit.formatted_text import AnyFormattedText, StyleAndTextTuples, to_formatted_text
+from prompt_toolkit.formatted_text import AnyFormattedText, OneStyleAndTextTuple, StyleAndTextTuples, to_formatted_text
 from prompt_toolkit.formatted_text.utils import fragment_list_len, fragment_list_to_text
 from prompt_toolkit.search import SearchDirection
 from prompt_toolkit.utils import to_int, to_str
@@ -52,6 +53,14 @@ SourceToDisplay = Callable[[int], int]
 DisplayToSource = Callable[[int], int]
 
 
+def _identity(i: int) ->int:
+    """
+    Position mapping of a `Transformation` that doesn't move any text. (One
+    shared function, instead of a new lambda for every transformed line.)
+    """
+    return i
+
+
 class TransformationInput:
     """
     :param buffer_control: :class:`.BufferControl` instance.
@@ -94,8 +103,8 @@ class Transformation:
         SourceToDisplay | None)=None, display_to_source: (DisplayToSource |
         None)=None) ->None:
         self.fragments = fragments
-        self.source_to_display = source_to_display or (lambda i: i)
-        self.display_to_source = display_to_source or (lambda i: i)
+        self.source_to_display = source_to_display or _identity
+        self.display_to_source = display_to_source or _identity
 
 
 class DummyProcessor(Processor):
@@ -115,6 +124,12 @@ class HighlightSearchProcessor(Processor):
     _classname = 'search'
     _classname_current = 'search.current'
 
+    def __init__(self) ->None:
+        # Compiled search patterns, by (search_text, ignore_case). (This
+        # processor runs for every visible line.)
+        self._pattern_cache: SimpleCache[tuple[str, bool], re.Pattern[str]
+            ] = SimpleCache(maxsize=8)
+
     def _get_search_text(self, buffer_control: BufferControl) ->str:
         """
         The text we are searching for.
@@ -122,6 +137,68 @@ class HighlightSearchProcessor(Processor):
         search_state = buffer_control.search_state
         return search_state.text if search_state else ''
 
+    def _get_pattern(self, search_text: str, ignore_case: bool) ->re.Pattern[
+        str]:
+        """
+        Return the compiled pattern that matches `search_text` literally.
+        """
+        flags = re.IGNORECASE if ignore_case else re.RegexFlag(0)
+        return self._pattern_cache.get((search_text, ignore_case), lambda :
+            re.compile(re.escape(search_text), flags))
+
+    def apply_transformation(self, transformation_input: TransformationInput
+        ) ->Transformation:
+        buffer_control = transformation_input.buffer_control
+        document = transformation_input.document
+        lineno = transformation_input.lineno
+        fragments = transformation_input.fragments
+
+        search_text = self._get_search_text(buffer_control)
+
+        if search_text and not get_app().is_done:
+            searchmatch_fragment = f' class:{self._classname} '
+            searchmatch_current_fragment = f' class:{self._classname_current} '
+
+            # For each search match, replace the style string.
+            line_text = fragment_list_to_text(fragments)
+            fragments = explode_text_fragments(fragments)
+
+            pattern = self._get_pattern(search_text, bool(buffer_control.
+                search_state.ignore_case()))
+
+            # Get cursor column.
+            cursor_column: int | None
+            if document.cursor_position_row == lineno:
+                cursor_column = transformation_input.source_to_display(document
+                    .cursor_position_col)
+            else:
+                cursor_column = None
+
+            # The new style for every (style, suffix) combination on this
+            # line, so that characters with the same style share one string.
+            new_styles: dict[tuple[str, str], str] = {}
+
+            for match in pattern.finditer(line_text):
+                if cursor_column is not None:
+                    on_cursor = match.start() <= cursor_column < match.end()
+                else:
+                    on_cursor = False
+
+                if on_cursor:
+                    style_suffix = searchmatch_current_fragment
+                else:
+                    style_suffix = searchmatch_fragment
+
+                for i in range(match.start(), match.end()):
+                    old_fragment, text, *_ = fragments[i]
+                    key = old_fragment, style_suffix
+                    new_style = new_styles.get(key)
+                    if new_style is None:
+                        new_style = new_styles[key] = old_fragment + style_suffix
+                    fragments[i] = new_style, text
+
+        return Transformation(fragments)
+
 
 class HighlightIncrementalSearchProcessor(HighlightSearchProcessor):
     """
@@ -159,6 +236,15 @@ class PasswordProcessor(Processor):
     def __init__(self, char: str='*') ->None:
         self.char = char
 
+    def apply_transformation(self, ti: TransformationInput) ->Transformation:
+        # Every fragment is replaced as a whole. (The text keeps its length,
+        # so the position mappings are the identity.)
+        char = self.char
+        fragments: StyleAndTextTuples = cast(StyleAndTextTuples, [(style,
+            char * len(text), *handler) for style, text, *handler in ti.
+            fragments])
+        return Transformation(fragments)
+
 
 class HighlightMatchingBracketProcessor(Processor):
     """
@@ -179,50 +265,108 @@ class HighlightMatchingBracketProcessor(Processor):
         self.max_cursor_distance = max_cursor_distance
         self._positions_cache: SimpleCache[Hashable, list[tuple[int, int]]
             ] = SimpleCache(maxsize=8)
+        self._bracket_pairs_cache: SimpleCache[Hashable, dict[int, int]
+            ] = SimpleCache(maxsize=8)
 
     def _get_positions_to_highlight(self, document: Document) ->list[tuple[
         int, int]]:
         """
         Return a list of (row, col) tuples that need to be highlighted.
         """
-        cursor_row, cursor_col = document.translate_index_to_position(
-            document.cursor_position)
-        
-        def find_matching_bracket(pos, direction):
-            stack = []
-            for i in range(pos, 0 if direction < 0 else len(document.text), direction):
-                char = document.text[i]
-                if char in self.chars:
-                    if not stack and char in self._closing_braces:
-                        return i
-                    if self.chars.index(char) % 2 == 0:
-                        stack.append(char)
-                    else:
-                        if stack and self.chars.index(stack[-1]) == self.chars.index(char) - 1:
-                            stack.pop()
-                        else:
-                            return i
-                    if not stack:
-                        return i
-            return -1
-
-        result = []
-        cursor_char = document.text[document.cursor_position] if document.cursor_position < len(document.text) else ''
-        
-        if cursor_char in self.chars:
-            pos = document.cursor_position
-        elif document.cursor_position > 0 and document.text[document.cursor_position - 1] in self.chars:
-            pos = document.cursor_position - 1
+        text = document.text
+        cursor = document.cursor_position
+
+        # Try for the character under the cursor, then for the (closing)
+        # bracket before the cursor.
+        if document.current_char and document.current_char in self.chars:
+            bracket = cursor
+        elif (document.char_before_cursor and document.char_before_cursor in
+            self._closing_braces and document.char_before_cursor in self.chars):
+            bracket = cursor - 1
         else:
-            return result
+            return []
+
+        # Pair the brackets in a window that includes `max_cursor_distance`
+        # on both sides. The window only moves when the bracket leaves its
+        # middle block, so that cursor movements reuse the same pairs.
+        distance = max(1, self.max_cursor_distance)
+        window_start = max(0, (bracket // distance - 1) * distance)
+        window_end = window_start + 3 * distance
+        chars = self.chars
+        pairs = self._bracket_pairs_cache.get((text, chars, window_start,
+            window_end), lambda : _find_bracket_pairs(text, chars,
+            window_start, window_end))
+
+        match = pairs.get(bracket)
+        if match is None or abs(match - bracket) > self.max_cursor_distance:
+            return []
+
+        return [document.translate_index_to_position(match), document.
+            translate_index_to_position(bracket)]
+
+    def apply_transformation(self, transformation_input: TransformationInput
+        ) ->Transformation:
+        document = transformation_input.document
+        lineno = transformation_input.lineno
+        fragments = transformation_input.fragments
+
+        # When the application is in the 'done' state, don't highlight.
+        if get_app().is_done:
+            return Transformation(fragments)
+
+        # Get the highlight positions. (Once per render, not for every line.)
+        key = get_app().render_counter, document.text, document.cursor_position
+        positions = self._positions_cache.get(key, lambda : self.
+            _get_positions_to_highlight(document))
+
+        # Apply if positions were found at this line.
+        if positions:
+            for row, col in positions:
+                if row == lineno:
+                    col = transformation_input.source_to_display(col)
+                    fragments = explode_text_fragments(fragments)
+                    style, text, *_ = fragments[col]
+
+                    if col == document.cursor_position_col:
+                        style += ' class:matching-bracket.cursor '
+                    else:
+                        style += ' class:matching-bracket.other '
+
+                    fragments[col] = style, text
+
+        return Transformation(fragments)
 
-        if abs(pos - document.cursor_position) <= self.max_cursor_distance:
-            matching_pos = find_matching_bracket(pos, 1 if self.chars.index(document.text[pos]) % 2 == 0 else -1)
-            if matching_pos != -1:
-                result.append(document.translate_index_to_position(pos))
-                result.append(document.translate_index_to_position(matching_pos))
 
-        return result
+def _find_bracket_pairs(text: str, chars: str, start: int, end: int) ->dict[
+    int, int]:
+    """
+    Pair the brackets in `text[start:end]`. Returns a dictionary that maps the
+    position of every matched bracket to the position of its counterpart.
+
+    :param chars: The brackets, as a string of (opening, closing) pairs.
+
+    Every kind of bracket has its own stack, so other kinds of brackets in
+    between don't affect the match. (Like `Document.find_matching_bracket_position`.)
+    """
+    opening = chars[0::2]
+    closing_to_opening = dict(zip(chars[1::2], opening))
+    stacks: dict[str, list[int]] = {c: [] for c in opening}
+    pairs: dict[int, int] = {}
+
+    # Only visit the brackets, not every character.
+    for match in re.compile('[%s]' % re.escape(chars)).finditer(text, start,
+        end):
+        i = match.start()
+        c = text[i]
+        if c in stacks:
+            stacks[c].append(i)
+        else:
+            stack = stacks[closing_to_opening[c]]
+            if stack:
+                j = stack.pop()
+                pairs[i] = j
+                pairs[j] = i
+    return pairs
 
 
 class DisplayMultipleCursors(Processor):
@@ -349,6 +493,72 @@ class TabsProcessor(Processor):
         self.tabstop = tabstop
         self.style = style
 
+    def apply_transformation(self, ti: TransformationInput) ->Transformation:
+        # Most lines don't contain tabs. Leave those as they are.
+        if not any('\t' in fragment[1] for fragment in ti.fragments):
+            return Transformation(ti.fragments)
+
+        tabstop = to_int(self.tabstop)
+        style = self.style
+
+        # Create separator for tabs.
+        separator1 = to_str(self.char1)
+        separator2 = to_str(self.char2)
+
+        # Transform fragments. (Text between tabs is copied as a whole,
+        # fragments are not exploded into characters.)
+        result_fragments: StyleAndTextTuples = []
+        # The display position of every source position.
+        position_mappings: list[int] = []
+        pos = 0
+
+        for fragment in ti.fragments:
+            text = fragment[1]
+            if '\t' not in text:
+                result_fragments.append(fragment)
+                position_mappings.extend(range(pos, pos + len(text)))
+                pos += len(text)
+                continue
+
+            start = 0
+            while True:
+                tab = text.find('\t', start)
+                end = len(text) if tab == -1 else tab
+                if end > start:
+                    result_fragments.append(cast(OneStyleAndTextTuple, (
+                        fragment[0], text[start:end], *fragment[2:])))
+                    position_mappings.extend(range(pos, pos + end - start))
+                    pos += end - start
+                if tab == -1:
+                    break
+
+                # Calculate how many characters we have to insert.
+                count = tabstop - pos % tabstop
+
+                # Insert tab.
+                result_fragments.append((style, separator1))
+                result_fragments.append((style, separator2 * (count - 1)))
+                position_mappings.append(pos)
+                pos += count
+                start = tab + 1
+
+        # The cursor can be right after the line as well.
+        position_mappings.append(pos)
+        position_mappings.append(pos + 1)
+
+        def source_to_display(from_position: int) ->int:
+            """Maps original cursor position to the new one."""
+            return position_mappings[from_position]
+
+        def display_to_source(display_pos: int) ->int:
+            """Maps display cursor position to the original one."""
+            # `position_mappings` is increasing: take the last source position
+            # that is displayed at or before `display_pos`.
+            return max(0, bisect_right(position_mappings, display_pos) - 1)
+
+        return Transformation(result_fragments, source_to_display=
+            source_to_display, display_to_source=display_to_source)
+
 
 class ReverseSearchProcessor(Processor):
     """
@@ -386,6 +596,14 @@ class ConditionalProcessor(Processor):
         self.processor = processor
         self.filter = to_filter(filter)
 
+    def apply_transformation(self, transformation_input: TransformationInput
+        ) ->Transformation:
+        # Run processor when enabled.
+        if self.filter():
+            return self.processor.apply_transformation(transformation_input)
+        else:
+            return Transformation(transformation_input.fragments)
+
     def __repr__(self) ->str:
         return '{}(processor={!r}, filter={!r})'.format(self.__class__.
             __name__, self.processor, self.filter)
@@ -131,7 +131,7 @@ def accept_search() ->None:
 
             # If we're in Vi mode and in navigation mode, go back to 
             # insert mode.
-            if app.vi_state.input_mode == InputMode.NAVIGATION:
+            if app.vi_state.input_mode is InputMode.NAVIGATION:
                 app.vi_state.input_mode = InputMode.INSERT
 
 